@@ -5,6 +5,15 @@ WEBHOOK = ""
 LOCATION = "GB"
 LANGUAGE = "en-GB"
 
+# Multiple countries can be monitored from one process by listing "<country code> <language code>" pairs
+# LOCATION and LANGUAGE are ignored when REGIONS is set
+# E.G. REGIONS = ["GB en-GB", "US en", "FR fr"]
+REGIONS = []
+
+# --------------------- REQUEST BUDGET ---------------------
+# Maximum number of feed requests per second across all countries (0 for no limit)
+REQUESTS_PER_SECOND = 10
+
 # --------------------- FREE PROXY ---------------------
 # A single or multiple locations can be added in the array (e.g. ["GB"] or ["GB", "US"])
 ENABLE_FREE_PROXY = False
@@ -14,6 +23,16 @@ FREE_PROXY_LOCATION = ["GB"]
 # Delay between site requests
 DELAY = 5
 
+# --------------------- FEED PAGES ---------------------
+# Maximum number of feed pages (60 products each) requested at the same time
+PAGES = 4
+
+# --------------------- MARKDOWNS ---------------------
+# Notifies when an in stock colourway's price drops at least MARKDOWN percent below its recent high (0 to disable)
+# The last PRICE_HISTORY price changes are kept for each colourway
+MARKDOWN = 20
+PRICE_HISTORY = 5
+
 # --------------------- OPTIONAL PROXY ---------------------
 # Proxies must follow this format: "<proxy>:<port>" OR "<proxy_username>:<proxy_password>@<proxy_domain>:<port>")
 # If you want to use multiple proxies, please create an array
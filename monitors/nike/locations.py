@@ -1,5 +1,12 @@
 import requests 
+import hashlib
 import json
+import logging
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 ___standard_api___ = [
     'GB', 'US', 'AU', 'AT', 'BE', 'BG', 'CA', 'CN', 'HR', 'CZ', 'DK', 'EG', 
@@ -8,7 +15,161 @@ ___standard_api___ = [
     'ES', 'SE', 'CH', 'TR', 'AE', 'VN', 'JP' 
 ]
 
-def standard_api(ITEMS, LOCATION, LANGUAGE, user_agent, proxy, KEYWORDS, start):
+# Products per page of the browse feed
+FEED_COUNT = 60
+
+# Pooled session reused across polls, countries and concurrent feed pages
+SESSION = requests.Session()
+SESSION.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=32))
+
+# Maximum number of feed requests per second across all countries (0 for no limit)
+REQUESTS_PER_SECOND = 0
+REQUEST_LOCK = threading.Lock()
+NEXT_REQUEST = 0.0
+
+# Number of feed pages found on the last poll of each (location, language)
+FEED_PAGES = {}
+
+# Fingerprint of the last body of each feed page and whether it had a next page
+FINGERPRINTS = {}  # {(location, language, anchor): (digest, more)}
+
+# Number of price changes kept for each colourway
+PRICE_HISTORY = 5
+
+
+def throttle():
+    """
+    Waits until the next feed request fits within the global request budget
+    """
+    global NEXT_REQUEST
+
+    if not REQUESTS_PER_SECOND:
+        return
+
+    with REQUEST_LOCK:
+        now = time.monotonic()
+        slot = max(now, NEXT_REQUEST)
+        NEXT_REQUEST = slot + 1.0 / REQUESTS_PER_SECOND
+    time.sleep(slot - now)
+
+
+def get_page(anchor, LOCATION, LANGUAGE, headers, proxy):
+    """
+    Requests a single page of the browse feed and returns the raw body
+    """
+    url = f'https://api.nike.com/cic/browse/v2?queryid=products&anonymousId=3BCF9783E5B8CEB165B9DB2C449B7F26&country={LOCATION}&endpoint=%2Fproduct_feed%2Frollup_threads%2Fv2%3Ffilter%3Dmarketplace({LOCATION})%26filter%3Dlanguage({LANGUAGE})%26filter%3DemployeePrice(true)%26filter%3DattributeIds(0f64ecc7-d624-4e91-b171-b83a03dd8550%2C16633190-45e5-4830-a068-232ac7aea82c)%26anchor%3D{anchor}%26consumerChannelId%3Dd9a5bc42-4b9c-4976-858a-f159cf99c647%26count%3D{FEED_COUNT}%26sort%3DeffectiveStartViewDateDesc&language=en-GB&localizedRangeStr=%7BlowestPrice%7D%E2%80%94%7BhighestPrice%7D'
+    throttle()
+    html = SESSION.get(url=url, timeout=20, headers=headers, proxies=proxy)
+    return html.content
+
+
+def fetch_feed(LOCATION, LANGUAGE, headers, proxy, PAGES):
+    """
+    Requests the anchor pages of the browse feed concurrently and returns the changed pages in anchor order, 
+    stopping at the page that reports no further pages.
+    Only the pages found on the last poll are requested, plus one more when the last of them reported a next page, up to PAGES.
+    Pages with the same body as the last poll are skipped without being decoded.
+    Each page is returned with its fingerprint, to be saved once the page has been processed
+    """
+    count = FEED_PAGES.get((LOCATION, LANGUAGE), PAGES)
+    last = FINGERPRINTS.get((LOCATION, LANGUAGE, (count - 1) * FEED_COUNT))
+    if last is None or last[1]:
+        count += 1
+    count = min(PAGES, count)
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        futures = [executor.submit(get_page, page * FEED_COUNT, LOCATION, LANGUAGE, headers, proxy) for page in range(count)]
+
+    outputs = []
+    received = 0
+    skipped = 0
+    error = None
+    for page, future in enumerate(futures):
+        if future.exception() is not None:
+            logging.error(msg=f'Skipping feed anchor {page * FEED_COUNT} this cycle: {future.exception()}')
+            error = error or future.exception()
+            continue
+
+        received += 1
+        raw = future.result()
+        digest = hashlib.blake2b(raw, digest_size=16).digest()
+        cached = FINGERPRINTS.get((LOCATION, LANGUAGE, page * FEED_COUNT))
+        if cached is not None and cached[0] == digest:
+            skipped += 1
+            more = cached[1]
+        else:
+            output = json.loads(raw)
+            more = bool(output['data']['products'].get('pages', {}).get('next'))
+            outputs.append((output, (LOCATION, LANGUAGE, page * FEED_COUNT), (digest, more)))
+
+        if not more:
+            FEED_PAGES[(LOCATION, LANGUAGE)] = page + 1
+            break
+    else:
+        FEED_PAGES[(LOCATION, LANGUAGE)] = count
+
+    logging.info(msg=f'{LOCATION} {LANGUAGE} feed: {len(outputs)} pages processed, {skipped} unchanged pages skipped')
+
+    if received == 0 and error is not None:
+        raise error
+    return outputs
+
+
+def track_price(PRICES, pid, price, MARKDOWN):
+    """
+    Records a colourway's price when it changes and returns the recent high
+    if the new price is at least MARKDOWN percent below it
+    """
+    history = PRICES.get(pid)
+    if history is None:
+        PRICES[pid] = deque([price], maxlen=PRICE_HISTORY)
+        return None
+
+    if price == history[-1]:
+        return None
+
+    history.append(price)
+    high = max(history)
+    if MARKDOWN and high > 0 and (high - price) / high * 100 >= MARKDOWN:
+        return high
+    return None
+
+
+def process_feed(ITEMS, output, LOCATION, LANGUAGE, KEYWORDS, start, PRICES=None, MARKDOWN=0):
+    """
+    Updates the set of in stock colourway pids and their price history from a page of the browse feed.
+    Returns the colourways that came back in stock or were marked down while in stock
+    """
+    to_discord = []
+    for item in output['data']['products']['products']:
+        if KEYWORDS != [] and not any(key.lower() in item['title'].lower() for key in KEYWORDS):
+            continue
+
+        for variant in item['colorways']:
+            previous_price = None
+            if PRICES is not None:
+                previous_price = track_price(PRICES, variant['pid'], variant['price']['currentPrice'], MARKDOWN)
+
+            if variant['inStock'] == True:
+                restocked = variant['pid'] not in ITEMS
+                ITEMS.add(variant['pid'])
+                if start == 0 and (restocked or previous_price is not None):
+                    to_discord.append(dict(
+                        title=item['title'],
+                        colour=variant['colorDescription'],
+                        url=f"https://www.nike.com/{LOCATION}/{variant['pdpUrl'].replace('{countryLang}', LANGUAGE)}",
+                        thumbnail=variant['images']['squarishURL'],
+                        price=str(variant['price']['currentPrice']),
+                        style_code=variant['pdpUrl'].split('/')[-1],
+                        previous_price=None if previous_price is None else str(previous_price)
+                    ))
+
+            else:
+                ITEMS.discard(variant['pid'])
+
+    return to_discord
+
+
+def standard_api(ITEMS, LOCATION, LANGUAGE, user_agent, proxy, KEYWORDS, start, PAGES=4, PRICES=None, MARKDOWN=0):
     headers = {
         'accept': '*/*',
         'accept-encoding': 'gzip, deflate, br',
@@ -27,42 +188,10 @@ def standard_api(ITEMS, LOCATION, LANGUAGE, user_agent, proxy, KEYWORDS, start):
 
     to_discord = []
     
-    anchor = 0
-    while anchor < 181:
-        print('-- scrape --')
-        url = f'https://api.nike.com/cic/browse/v2?queryid=products&anonymousId=3BCF9783E5B8CEB165B9DB2C449B7F26&country={LOCATION}&endpoint=%2Fproduct_feed%2Frollup_threads%2Fv2%3Ffilter%3Dmarketplace({LOCATION})%26filter%3Dlanguage({LANGUAGE})%26filter%3DemployeePrice(true)%26filter%3DattributeIds(0f64ecc7-d624-4e91-b171-b83a03dd8550%2C16633190-45e5-4830-a068-232ac7aea82c)%26anchor%3D{anchor}%26consumerChannelId%3Dd9a5bc42-4b9c-4976-858a-f159cf99c647%26count%3D60%26sort%3DeffectiveStartViewDateDesc&language=en-GB&localizedRangeStr=%7BlowestPrice%7D%E2%80%94%7BhighestPrice%7D'
-        html = requests.get(url=url, timeout=20, headers=headers, proxies=proxy)
-        output = json.loads(html.text)
-
-        for item in output['data']['products']['products']:
-            for variant in item['colorways']:
-                if KEYWORDS == []:
-                    if (variant['inStock'] == True) and (variant['pid'] not in ITEMS):
-                        if start == 0:
-                            to_discord.append(dict(
-                                title=item['title'],
-                                colour=variant['colorDescription'],
-                                url=f"https://www.nike.com/{LOCATION}/{variant['pdpUrl'].replace('{countryLang}', LANGUAGE)}",
-                                thumbnail=variant['images']['squarishURL'],
-                                price=str(variant['price']['currentPrice']),
-                                style_code=variant['pdpUrl'].split('/')[-1]
-                            ))
-
-                    elif (variant['inStock'] == False) and (variant['pid'] in ITEMS):
-                        ITEMS.remove(variant['id'])
-                
-                else:
-                    for key in KEYWORDS:
-                        if key.lower() in item['title'].lower():
-                            if start == 0:
-                                to_discord.append(dict(
-                                    title=item['title'],
-                                    colour=variant['colorDescription'],
-                                    url=f"https://www.nike.com/{LOCATION}/{variant['pdpUrl'].replace('{countryLang}', LANGUAGE)}",
-                                    thumbnail=variant['images']['squarishURL'],
-                                    price=str(variant['price']['currentPrice']),
-                                    style_code=variant['pdpUrl'].split('/')[-1]
-                                ))
-                
-        anchor += 60
-    return to_discord
\ No newline at end of file
+    for output, key, fingerprint in fetch_feed(LOCATION, LANGUAGE, headers, proxy, PAGES):
+        to_discord += process_feed(ITEMS, output, LOCATION, LANGUAGE, KEYWORDS, start, PRICES, MARKDOWN)
+
+        # Only a page that was processed in full is skipped when it comes back unchanged
+        FINGERPRINTS[key] = fingerprint
+
+    return to_discord
@@ -5,6 +5,7 @@ import requests as rq
 import urllib3
 from fp.fp import FreeProxy
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import time
 
@@ -13,7 +14,7 @@ import logging
 import traceback
 
 import locations
-from config import WEBHOOK, LOCATION, LANGUAGE, ENABLE_FREE_PROXY, FREE_PROXY_LOCATION, DELAY, PROXY, KEYWORDS, USERNAME, AVATAR_URL, COLOUR
+from config import WEBHOOK, LOCATION, LANGUAGE, ENABLE_FREE_PROXY, FREE_PROXY_LOCATION, DELAY, PROXY, KEYWORDS, USERNAME, AVATAR_URL, COLOUR, PAGES, MARKDOWN, PRICE_HISTORY, REGIONS, REQUESTS_PER_SECOND
 
 
 logging.basicConfig(filename='nike-monitor.log', filemode='a', format='%(asctime)s - %(name)s - %(message)s', level=logging.DEBUG)
@@ -26,12 +27,21 @@ if ENABLE_FREE_PROXY:
     proxy_obj = FreeProxy(country_id=FREE_PROXY_LOCATION, rand=True)
 
 
-INSTOCK = []
+INSTOCK = {}  # {(location, language): pids of in stock colourways}
+PRICES = {}  # {(location, language): {pid: recent price changes}}
 
-def discord_webhook(title, colour, url, thumbnail, price, style_code):
+def discord_webhook(title, colour, url, thumbnail, price, style_code, regions=None):
     """
     Sends a Discord webhook notification to the specified webhook URL
     """
+    fields = [
+        {'name': 'Colour', 'value': colour},
+        {'name': 'Price', 'value': price},
+        {'name': 'Style Code', 'value': style_code},
+    ]
+    if regions:
+        fields.append({'name': 'Regions', 'value': ', '.join(regions)})
+
     data = {
         'username': USERNAME,
         'avatar_url':  AVATAR_URL,
@@ -42,11 +52,7 @@ def discord_webhook(title, colour, url, thumbnail, price, style_code):
             'color': int(COLOUR),
             'footer': {'text': 'Developed by GitHub:yasserqureshi1'},
             'timestamp': str(datetime.utcnow()),
-            'fields': [
-                {'name': 'Colour', 'value': colour},
-                {'name': 'Price', 'value': price},
-                {'name': 'Style Code', 'value': style_code},
-            ]
+            'fields': fields
         }]
     }
     
@@ -61,6 +67,46 @@ def discord_webhook(title, colour, url, thumbnail, price, style_code):
         logging.info(msg="Payload delivered successfully, code {}.".format(result.status_code))
 
 
+def format_price(price, previous_price):
+    """
+    Shows the previous price and the drop for markdowns
+    """
+    if previous_price is None:
+        return price
+
+    drop = round((float(previous_price) - float(price)) / float(previous_price) * 100)
+    return f'~~{previous_price}~~ {price} (-{drop}%)'
+
+
+def scrape_region(location, language, user_agent, proxy, start):
+    """
+    Scrapes a single country with its own stock and price state and returns the colourways to notify
+    """
+    return locations.standard_api(INSTOCK.setdefault((location, language), set()), location, language, user_agent, proxy, KEYWORDS, start, PAGES, PRICES.setdefault((location, language), {}), MARKDOWN)
+
+
+def group_products(results):
+    """
+    Collapses a colourway notified in several countries in the same cycle into a single notification listing the countries
+    """
+    products = {}
+    for location, to_discord in results:
+        for product in to_discord:
+            price = format_price(product['price'], product['previous_price'])
+            if product['style_code'] not in products:
+                products[product['style_code']] = dict(product, price=price, regions=[location], region_prices=[(location, price)])
+            else:
+                products[product['style_code']]['regions'].append(location)
+                products[product['style_code']]['region_prices'].append((location, price))
+
+    for product in products.values():
+        if len(product['regions']) > 1:
+            product['price'] = '\n'.join(f'**{location}** {price}' for location, price in product['region_prices'])
+        del product['region_prices']
+
+    return list(products.values())
+
+
 def monitor():
     """
     Initiates the monitor
@@ -70,8 +116,23 @@ def monitor():
 ---------------------------------\n''')
     logging.info(msg='Successfully started monitor')
 
-    # Ensures that first scrape does not notify all products
-    start = 1
+    # Countries as (country code, language code), which also key each country's state
+    regions = list(dict.fromkeys(tuple(region.split()) for region in REGIONS)) if REGIONS != [] else [(LOCATION, LANGUAGE)]
+    for location, language in regions:
+        if location not in locations.___standard_api___:
+            print(f'LOCATION "{location}" CURRENTLY NOT AVAILABLE. IF YOU BELIEVE THIS IS A MISTAKE PLEASE CREATE AN ISSUE ON GITHUB OR MESSAGE THE #issues CHANNEL IN DISCORD.')
+            return
+
+    # Countries are named by country code, with the language added for countries monitored in several languages
+    countries = [location for location, language in regions]
+    labels = {region: region[0] if countries.count(region[0]) == 1 else ' '.join(region) for region in regions}
+
+    # Number of price changes kept for markdowns and the global budget for feed requests across all countries
+    locations.PRICE_HISTORY = PRICE_HISTORY
+    locations.REQUESTS_PER_SECOND = REQUESTS_PER_SECOND
+
+    # Ensures that first scrape of each country does not notify all products
+    start = {region: 1 for region in regions}
 
     # Initialising proxy and headers
     if ENABLE_FREE_PROXY:
@@ -83,22 +144,40 @@ def monitor():
         proxy = {}
     user_agent = user_agent_rotator.get_random_user_agent()
 
+    # Countries are polled concurrently
+    executor = ThreadPoolExecutor(max_workers=len(regions))
+
     while True:
         # Makes request to site and stores products 
+        futures = {region: executor.submit(scrape_region, region[0], region[1], user_agent, proxy, start[region]) for region in regions}
+
+        results = []
+        rotate = False
+        for region, future in futures.items():
+            try:
+                results.append((labels[region], future.result()))
+
+                # Allows changes to be notified
+                start[region] = 0
+
+            except rq.exceptions.RequestException as e:
+                logging.error(e)
+                rotate = True
+
+            except Exception as e:
+                print(f"Exception found: {traceback.format_exc()}")
+                logging.error(e)
+
         try:
-            if LOCATION in locations.___standard_api___:
-                to_discord = locations.standard_api(INSTOCK, LOCATION, LANGUAGE, user_agent, proxy, KEYWORDS, start)
-            
-            else:
-                print(f'LOCATION "{LOCATION}" CURRENTLY NOT AVAILABLE. IF YOU BELIEVE THIS IS A MISTAKE PLEASE CREATE AN ISSUE ON GITHUB OR MESSAGE THE #issues CHANNEL IN DISCORD.')
-                return
-            
-            for product in to_discord:
-                discord_webhook(product['title'], product['colour'], product['url'], product['thumbnail'], product['price'], product['style_code'])
+            for product in group_products(results):
+                discord_webhook(product['title'], product['colour'], product['url'], product['thumbnail'], product['price'], product['style_code'], product['regions'] if len(regions) > 1 else None)
                 print(product['title'])
 
-        except rq.exceptions.RequestException as e:
+        except Exception as e:
+            print(f"Exception found: {traceback.format_exc()}")
             logging.error(e)
+
+        if rotate:
             logging.info('Rotating headers and proxy')
 
             # Rotates headers
@@ -111,13 +190,6 @@ def monitor():
                 proxy_no = 0 if proxy_no == (len(PROXY)-1) else proxy_no + 1
                 proxy = {"http": PROXY[proxy_no], "https": PROXY[proxy_no]}
 
-        except Exception as e:
-            print(f"Exception found: {traceback.format_exc()}")
-            logging.error(e)
-
-        # Allows changes to be notified
-        start = 0
-
         # User set delay
         time.sleep(float(DELAY))
 
@@ -0,0 +1,106 @@
+"""
+Test script to replay a sequence of browse feed pages through the Nike stock comparator
+Checks that only out of stock -> in stock changes and markdowns are notified
+Usage: python test_replay.py [recorded feed pages .json]
+"""
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from locations import process_feed
+
+
+def page(stock, prices={}):
+    """
+    Builds a browse feed page from {pid: inStock} and {pid: currentPrice}
+    """
+    return {'data': {'products': {'products': [{
+        'title': f'Nike Dunk Low {pid}',
+        'colorways': [{
+            'pid': pid,
+            'inStock': in_stock,
+            'colorDescription': 'White/Black',
+            'pdpUrl': '{countryLang}/t/dunk-low/' + pid,
+            'images': {'squarishURL': f'https://static.nike.com/{pid}.jpg'},
+            'price': {'currentPrice': prices.get(pid, 109.99)}
+        }]
+    } for pid, in_stock in stock.items()], 'pages': {'next': ''}}}}
+
+
+# Feed sequence with the colourways that should be notified on each cycle
+SEQUENCE = [
+    (page({'A': True, 'B': False, 'C': True}), []),
+    (page({'A': True, 'B': False, 'C': True}), []),
+    (page({'A': True, 'B': True, 'C': True}), ['B']),
+    (page({'A': False, 'B': True, 'C': True}), []),
+    (page({'A': False, 'B': True, 'C': True}), []),
+    (page({'A': True, 'B': True, 'C': False}), ['A']),
+    (page({'A': True, 'B': True, 'C': True, 'D': True}), ['C', 'D']),
+    (page({'A': True, 'B': True, 'C': True, 'D': True}), []),
+]
+
+
+# Price sequence with the colourways that should be notified as marked down on each cycle
+MARKDOWNS = [
+    (page({'A': True, 'B': True, 'C': False}, {'A': 100, 'B': 100, 'C': 100}), []),
+    (page({'A': True, 'B': True, 'C': False}, {'A': 90, 'B': 120, 'C': 50}), []),
+    (page({'A': True, 'B': True, 'C': False}, {'A': 75, 'B': 90, 'C': 50}), ['A', 'B']),
+    (page({'A': True, 'B': True, 'C': False}, {'A': 75, 'B': 90, 'C': 50}), []),
+    (page({'A': True, 'B': True, 'C': False}, {'A': 100, 'B': 90, 'C': 50}), []),
+]
+
+
+def replay(pages, keywords=[], markdown=0):
+    """
+    Runs every page through the comparator as successive cycles and returns the pids notified on each
+    """
+    items = set()
+    prices = {}
+    notified = []
+    for cycle, output in enumerate(pages):
+        to_discord = process_feed(items, output, 'GB', 'en-GB', keywords, 1 if cycle == 0 else 0, prices, markdown)
+        notified.append([product['style_code'] for product in to_discord])
+    return notified
+
+
+if __name__ == '__main__':
+    print("Testing Nike stock comparator replay")
+    print("=" * 60)
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            pages = json.load(f)
+        print(f"\n[1] Replaying {len(pages)} recorded pages from {sys.argv[1]}...")
+        for cycle, pids in enumerate(replay(pages)):
+            print(f"   Cycle {cycle}: {len(pids)} notification(s) {pids}")
+        sys.exit(0)
+
+    failed = 0
+
+    print(f"\n[1] Replaying {len(SEQUENCE)} cycles...")
+    notified = replay([output for output, expected in SEQUENCE])
+    for cycle, (pids, (output, expected)) in enumerate(zip(notified, SEQUENCE)):
+        ok = pids == expected
+        failed += not ok
+        print(f"   Cycle {cycle}: notified {pids}, expected {expected} {'[OK]' if ok else '[FAIL]'}")
+
+    print("\n[2] Replaying with keywords...")
+    notified = replay([output for output, expected in SEQUENCE], keywords=['dunk low d'])
+    ok = sum(notified, []) == ['D']
+    failed += not ok
+    print(f"   Notified {sum(notified, [])}, expected ['D'] {'[OK]' if ok else '[FAIL]'}")
+
+    print("\n[3] Replaying price changes with a 20% markdown threshold...")
+    notified = replay([output for output, expected in MARKDOWNS], markdown=20)
+    for cycle, (pids, (output, expected)) in enumerate(zip(notified, MARKDOWNS)):
+        ok = pids == expected
+        failed += not ok
+        print(f"   Cycle {cycle}: notified {pids}, expected {expected} {'[OK]' if ok else '[FAIL]'}")
+
+    print("\n" + "=" * 60)
+    if failed:
+        print(f"[FAIL] {failed} check(s) failed")
+        sys.exit(1)
+    print("[OK] Only out of stock -> in stock changes and markdowns were notified")
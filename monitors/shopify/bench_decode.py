@@ -0,0 +1,89 @@
+"""
+Benchmark for the products.json decoder
+Compares CPU time and peak memory of a full json.loads against the selective decoder used by the monitor
+Usage: python bench_decode.py [saved products.json page]
+"""
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from monitor import decode_products
+
+FIXTURE = 'products_fixture.json'
+RUNS = 20
+
+
+def build_fixture(path, products=250, variants=14, images=8):
+    """
+    Saves a large-store products.json page with full body_html, images and options
+    """
+    random.seed(1)
+    output = []
+    for pid in range(1, products + 1):
+        output.append({
+            'id': pid,
+            'title': f'Sample Sneaker {pid}',
+            'handle': f'sample-sneaker-{pid}',
+            'body_html': '<p>' + 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 80 + '</p>',
+            'published_at': '2024-01-01T10:00:00-05:00',
+            'created_at': '2024-01-01T10:00:00-05:00',
+            'updated_at': '2024-02-01T10:00:00-05:00',
+            'vendor': 'Brand',
+            'product_type': 'Footwear',
+            'tags': ['sneaker', 'footwear', 'new'],
+            'variants': [{
+                'id': pid * 100 + i, 'title': f'US {7 + i * 0.5}', 'option1': f'US {7 + i * 0.5}', 'option2': None, 'option3': None,
+                'sku': f'SKU-{pid}-{i}', 'requires_shipping': True, 'taxable': True, 'featured_image': None,
+                'available': random.random() < 0.5, 'price': '180.00', 'grams': 1200, 'compare_at_price': None,
+                'position': i + 1, 'product_id': pid, 'created_at': '2024-01-01T10:00:00-05:00', 'updated_at': '2024-02-01T10:00:00-05:00'
+            } for i in range(variants)],
+            'images': [{
+                'id': pid * 10 + i, 'created_at': '2024-01-01T10:00:00-05:00', 'position': i + 1, 'updated_at': '2024-01-01T10:00:00-05:00',
+                'product_id': pid, 'variant_ids': [], 'src': f'https://cdn.shopify.com/s/files/1/0001/products/{pid}_{i}.jpg?v=1700000000',
+                'width': 2048, 'height': 2048
+            } for i in range(images)],
+            'options': [{'name': 'Size', 'position': 1, 'values': [f'US {7 + i * 0.5}' for i in range(variants)]}]
+        })
+
+    with open(path, 'w') as f:
+        json.dump({'products': output}, f, separators=(',', ':'))
+
+
+def measure(name, decode, raw):
+    """
+    Prints the best CPU time and the peak memory of a decoder
+    """
+    decode(raw)
+    best = None
+    for _ in range(RUNS):
+        t = time.process_time()
+        decode(raw)
+        elapsed = time.process_time() - t
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    output = decode(raw)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del output
+
+    print(f'   {name:<10} {best * 1000:8.2f} ms   {peak / 1024:8.0f} KiB peak   {retained / 1024:8.0f} KiB retained')
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else FIXTURE
+    if not os.path.exists(path):
+        print(f'[INFO] Saving fixture to {path}')
+        build_fixture(path)
+
+    with open(path, 'rb') as f:
+        raw = f.read()
+
+    print('=' * 80)
+    print(f'Decoding {path} ({len(raw) / 1024 / 1024:.1f} MiB), best of {RUNS} runs')
+    print('=' * 80)
+    measure('json.loads', lambda r: json.loads(r)['products'], raw)
+    measure('selective', decode_products, raw)
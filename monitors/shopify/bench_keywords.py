@@ -0,0 +1,77 @@
+"""
+Benchmark for keyword filtering
+Compares the per-product cost of the old per-keyword loop against the compiled keyword matcher as KEYWORDS grows
+Usage: python bench_keywords.py
+"""
+import random
+import string
+import time
+
+from monitor import compile_keywords
+
+PRODUCTS = 5000
+RUNS = 5
+
+WORDS = [
+    'nike', 'dunk', 'low', 'high', 'jordan', 'retro', 'air', 'max', 'force', 'yeezy', 'boost', 'foam', 'runner',
+    'box', 'logo', 'hoodie', 'tee', 'crewneck', 'jacket', 'cap', 'beanie', 'bag', 'new', 'balance', 'salomon',
+    'panda', 'black', 'white', 'university', 'blue', 'red', 'green', 'grey', 'sail', 'og', 'sp', 'qs'
+]
+
+
+def random_keyword():
+    """
+    Builds a keyword that rarely matches, so every keyword has to be checked
+    """
+    return ''.join(random.choice(string.ascii_lowercase) for _ in range(random.randint(4, 9)))
+
+
+def old_filter(titles, keywords):
+    """
+    Previous behaviour: lowercases the title once per keyword and processes it once per matching keyword
+    """
+    processed = 0
+    for title in titles:
+        for key in keywords:
+            if key.lower() in title.lower():
+                processed += 1
+    return processed
+
+
+def new_filter(titles, matcher):
+    """
+    Compiled matcher: lowercases the title once and processes it at most once
+    """
+    processed = 0
+    for title in titles:
+        if matcher.search(title.lower()):
+            processed += 1
+    return processed
+
+
+def measure(filter, titles, keywords):
+    """
+    Returns the best per-product time in microseconds and the number of products processed
+    """
+    best = None
+    for _ in range(RUNS):
+        t = time.perf_counter()
+        processed = filter(titles, keywords)
+        elapsed = time.perf_counter() - t
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(titles) * 1e6, processed
+
+
+if __name__ == '__main__':
+    random.seed(1)
+    titles = [' '.join(random.choice(WORDS) for _ in range(6)).title() for _ in range(PRODUCTS)]
+
+    print('=' * 80)
+    print(f'Filtering {PRODUCTS} product titles, best of {RUNS} runs')
+    print('=' * 80)
+    print(f'   {"keywords":>8}   {"old loop":>12}   {"compiled":>12}   {"processed (old / new)":>22}')
+    for count in [1, 10, 50, 100, 250, 500]:
+        keywords = ['dunk', 'box logo'] + [random_keyword() for _ in range(count - 2)] if count > 2 else ['dunk', 'box logo'][:count]
+        old_time, old_processed = measure(old_filter, titles, keywords)
+        new_time, new_processed = measure(new_filter, titles, compile_keywords(keywords))
+        print(f'   {count:>8}   {old_time:>9.2f} us   {new_time:>9.2f} us   {old_processed:>10} / {new_processed:<10}')
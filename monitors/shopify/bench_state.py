@@ -0,0 +1,94 @@
+"""
+Memory benchmark for the stock state
+Compares the memory held by the original INSTOCK list of [title, image, handle, sizes] lists,
+a dict of product id -> variant id -> availability, and the compact state kept by the monitor
+Usage: python bench_state.py [products] [variants per product]
+"""
+import random
+import sys
+import tracemalloc
+
+from monitor import create_store, comparitor
+
+URL = 'https://kith.com/collections/footwear/products.json'
+
+
+def build_products(products, variants):
+    """
+    Builds decoded products as returned by the selective decoder
+    """
+    random.seed(1)
+    return [{
+        'id': 7000000000000 + p,
+        'title': f'Nike Dunk Low Retro Premium Colourway {p}',
+        'image': f'https://cdn.shopify.com/s/files/1/0094/2252/products/DUNK_{p}_1.jpg?v=1700000000',
+        'handle': f'nike-dunk-low-retro-premium-colourway-{p}',
+        'updated_at': '2024-02-01T10:00:00-05:00',
+        'variants': [{'id': 40000000000000 + p * 100 + i, 'title': f'US {7 + i * 0.5}', 'available': random.random() < 0.5} for i in range(variants)]
+    } for p in range(products)]
+
+
+def copy(text):
+    """
+    Returns a new string object, as decoding a fresh response would
+    """
+    return (text + '.')[:-1]
+
+
+def list_state(products):
+    """
+    Original state: a list of [title, image, handle, available sizes with prebuilt ATC links]
+    """
+    state = []
+    for product in products:
+        available_sizes = []
+        for size in product['variants']:
+            if size['available']:
+                available_sizes.append({'title': copy(size['title']), 'url': '[ATC](' + URL[:URL.find('/', 10)] + '/cart/' + str(size['id']) + ':1)'})
+        state.append([copy(product['title']), copy(product['image']), copy(product['handle']), available_sizes])
+    return state
+
+
+def dict_state(products):
+    """
+    Keyed state: product id -> variant id -> availability
+    """
+    return {product['id'] + 0: {size['id'] + 0: size['available'] for size in product['variants']} for product in products}
+
+
+def compact_state(products):
+    """
+    Compact state kept by the monitor: an array of variant ids and an availability bitmap per product
+    """
+    store = create_store(URL)
+    for product in products:
+        comparitor(store, product, 1)
+    return store['instock']
+
+
+def measure(name, build, products, baseline=None):
+    """
+    Prints the memory held by a state representation
+    """
+    tracemalloc.start()
+    state = build(products)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del state
+
+    ratio = f'{baseline / held:5.1f}x smaller' if baseline else ''
+    print(f'   {name:<10} {held / 1024:8.0f} KiB   {ratio}')
+    return held
+
+
+if __name__ == '__main__':
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    variants = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    catalog = build_products(products, variants)
+
+    print('=' * 80)
+    print(f'Stock state for {products} products x {variants} variants ({products * variants} variants)')
+    print('=' * 80)
+    baseline = measure('list', list_state, catalog)
+    measure('dict', dict_state, catalog, baseline)
+    measure('compact', compact_state, catalog, baseline)
@@ -5,6 +5,10 @@ WEBHOOK = "https://discord.com/api/webhooks/1428801182532632728/VvLx8EJVLQBFv9MZ
 # Ensure the URL is one that contains products.json (e.g. https://www.hanon-shop.com/collections/whats-new/products.json)
 URL = "https://kith.com/collections/footwear/products.json"
 
+# Multiple stores can be monitored from one process by listing their URLs in the array - URL is ignored when URLS is set
+# E.G. URLS = ["https://kith.com/collections/footwear/products.json", "https://www.hanon-shop.com/collections/whats-new/products.json"]
+URLS = []
+
 # --------------------- FREE PROXY ---------------------
 # A single or multiple locations can be added in the array (e.g. ["GB"] or ["GB", "US"])
 ENABLE_FREE_PROXY = False
@@ -14,6 +18,36 @@ FREE_PROXY_LOCATION = ["GB"]
 # Delay between site requests
 DELAY = 10
 
+# --------------------- CONCURRENCY ---------------------
+# Maximum number of products.json pages requested at the same time
+MAX_CONCURRENT_PAGES = 4
+
+# Maximum number of requests in flight to a single host, shared by every store on that host
+PER_HOST_LIMIT = 4
+
+# Maximum number of requests in flight across all stores
+MAX_CONNECTIONS = 32
+
+# --------------------- TIERED SCAN ---------------------
+# The first page of a store's hot collection (e.g. new arrivals) can be polled every HOT_DELAY seconds
+# alongside the full catalog, which is still polled every DELAY seconds. Both update the same stock
+# E.G. HOT_URLS = {"https://kith.com/collections/footwear/products.json": "https://kith.com/collections/whats-new/products.json"}
+HOT_URLS = {}
+HOT_DELAY = 2
+
+# --------------------- WATCHLIST ---------------------
+# Product handles whose /products/<handle>.js page is polled every WATCHLIST_DELAY seconds, separately from the catalog
+# E.G. WATCHLIST = {"https://kith.com/collections/footwear/products.json": ["handle-1", "handle-2"]}
+WATCHLIST = {}
+WATCHLIST_DELAY = 1
+
+# --------------------- INCREMENTAL MODE ---------------------
+# Only compares products whose updated_at timestamp has moved since they were last compared
+# Timestamps and stock are saved to WATERMARK_FILE at most every SAVE_INTERVAL seconds so they persist across restarts
+INCREMENTAL = False
+WATERMARK_FILE = "shopify-state.json"
+SAVE_INTERVAL = 30
+
 # --------------------- OPTIONAL PROXY ---------------------
 # Proxies must follow this format: "<proxy>:<port>" OR "<proxy_username>:<proxy_password>@<proxy_domain>:<port>")
 # If you want to use multiple proxies, please create an array
@@ -5,14 +5,22 @@ import requests as rq
 import urllib3
 from fp.fp import FreeProxy
 
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from array import array
 from datetime import datetime
-import time
+import functools
+import hashlib
+import asyncio
+import math
+import os
+import re
 
 import json
 import logging
 import traceback
 
-from config import WEBHOOK, ENABLE_FREE_PROXY, FREE_PROXY_LOCATION, DELAY, PROXY, KEYWORDS, USERNAME, AVATAR_URL, COLOUR, URL
+from config import WEBHOOK, ENABLE_FREE_PROXY, FREE_PROXY_LOCATION, DELAY, PROXY, KEYWORDS, USERNAME, AVATAR_URL, COLOUR, URL, URLS, MAX_CONCURRENT_PAGES, PER_HOST_LIMIT, MAX_CONNECTIONS, INCREMENTAL, WATERMARK_FILE, SAVE_INTERVAL, HOT_URLS, HOT_DELAY, WATCHLIST, WATCHLIST_DELAY
 
 logging.basicConfig(filename='shopify-monitor.log', filemode='a', format='%(asctime)s - %(name)s - %(message)s',
                     level=logging.DEBUG)
@@ -24,7 +32,59 @@ user_agent_rotator = UserAgent(software_names=software_names, hardware_type=hard
 if ENABLE_FREE_PROXY:  
     proxy_obj = FreeProxy(country_id=FREE_PROXY_LOCATION, rand=True)
 
-INSTOCK = []
+# Products per products.json page (Shopify maximum)
+PAGE_LIMIT = 250
+
+# Thread pool that runs blocking requests for every store
+EXECUTOR = ThreadPoolExecutor(max_workers=MAX_CONNECTIONS)
+
+# Per-host semaphores limiting the requests in flight to each host
+HOST_LIMITS = {}
+
+# Threads and connections kept for watched handles, one per handle, so they never queue behind a catalog sweep
+WATCH_EXECUTOR = ThreadPoolExecutor(max_workers=max(1, sum(len(handles) for handles in WATCHLIST.values())))
+WATCH_LIMITS = {}
+
+# Threads and connections kept for hot pages, one per hot store, for the same reason
+HOT_EXECUTOR = ThreadPoolExecutor(max_workers=max(1, len(HOT_URLS)))
+HOT_LIMITS = {}
+
+# Every monitored store, saved together to WATERMARK_FILE in incremental mode
+STORES = []
+
+
+def compile_keywords(keywords):
+    """
+    Compiles keywords into a single lowercase regex structured as a trie, so the cost of matching a title
+    stays flat as the number of keywords grows. Returns None when there are no keywords
+    """
+    if keywords == []:
+        return None
+
+    trie = {}
+    for key in keywords:
+        node = trie
+        for char in key.lower():
+            node = node.setdefault(char, {})
+        node[''] = {}  # Marks the end of a keyword
+
+    return re.compile(trie_pattern(trie))
+
+
+def trie_pattern(node):
+    """
+    Builds the regex for a node of the keyword trie
+    """
+    if '' in node:
+        # A keyword ends here, so any longer keyword sharing this prefix can never add a match
+        return ''
+    
+    branches = [re.escape(char) + trie_pattern(child) for char, child in sorted(node.items())]
+    return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+
+# Matches titles containing any of the keywords
+KEYWORD_MATCHER = compile_keywords(KEYWORDS)
 
 
 def check_url(url):
@@ -34,48 +94,293 @@ def check_url(url):
     return 'products.json' in url
 
 
-def scrape_site(url, headers, proxy):
+def create_store(url):
     """
-    Scrapes the specified Shopify site and adds items to array
+    Creates the state kept for a single store
     """
-    items = []
+    return {
+        'url': url,
+        'base': url[:url.find('/', 10)],
+        'host': urlparse(url).netloc,
+        'instock': {},  # {product_id: (array of variant ids, availability bitmap)}
+        'watermarks': {},  # {product_id: updated_at} of the products last compared
+        'dirty': False,  # Watermarks moved since the state was last saved
+        'catalog_size': 0,  # Products seen on the previous poll, used to predict the page count
+        'pages': asyncio.Semaphore(MAX_CONCURRENT_PAGES),  # Limits the pages of this store in flight
+        'page_cache': {},  # {page: {'fingerprint', 'etag', 'last_modified', 'count', 'size'}}
+        'hot_url': HOT_URLS.get(url),  # Collection whose first page is polled every HOT_DELAY
+        'hot_cache': {},  # Cache entry of the hot page
+        'watchlist': WATCHLIST.get(url, []),  # Handles polled individually every WATCHLIST_DELAY
+        'watch_cache': {},  # {handle: cache entry}
+        'stats': {},  # Pages and bytes fetched and short-circuited on the last poll
+        'start': 1  # Ensures that first scrape does not notify all products
+    }
+
+
+def load_state(stores):
+    """
+    Restores the watermarks and stock saved by a previous run
+    """
+    if not os.path.exists(WATERMARK_FILE):
+        return
+
+    try:
+        with open(WATERMARK_FILE) as f:
+            saved = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.error(msg='Could not load saved state: ' + str(e))
+        return
+
+    for store in stores:
+        for product_id, (updated_at, variant_ids, available) in saved.get(store['url'], {}).items():
+            store['watermarks'][int(product_id)] = updated_at
+            store['instock'][int(product_id)] = (array('q', variant_ids), available)
+
+        # Restocks that happened while the monitor was stopped are notified on the first poll
+        if saved.get(store['url']):
+            store['start'] = 0
+
+
+def snapshot_state(stores):
+    """
+    Copies the watermarks and stock of every store into a JSON-ready dict
+    """
+    saved = {}
+    for store in stores:
+        saved[store['url']] = {}
+        for product_id, updated_at in store['watermarks'].items():
+            if product_id in store['instock']:
+                variant_ids, available = store['instock'][product_id]
+                saved[store['url']][product_id] = [updated_at, variant_ids.tolist(), available]
+    return saved
 
-    # Makes request to site
+
+def save_state(saved):
+    """
+    Saves a snapshot of the state so it persists across restarts
+    """
+    # Writes to a temporary file first so an interrupted write does not corrupt the saved state
+    with open(WATERMARK_FILE + '.tmp', 'w') as f:
+        json.dump(saved, f)
+    os.replace(WATERMARK_FILE + '.tmp', WATERMARK_FILE)
+
+
+def create_session(hosts, reserved):
+    """
+    Creates a pooled session shared by every store, with reserved connections per host on top of PER_HOST_LIMIT
+    """
     s = rq.Session()
+    adapter = rq.adapters.HTTPAdapter(pool_connections=max(1, hosts), pool_maxsize=PER_HOST_LIMIT + reserved)
+    s.mount('http://', adapter)
+    s.mount('https://', adapter)
+    return s
+
+
+def create_client():
+    """
+    Creates the headers and proxy shared by every store
+    """
+    client = {
+        'headers': {
+            'User-Agent': user_agent_rotator.get_random_user_agent(),
+            'Cache-Control': 'no-cache, no-store, must-revalidate',
+            'Pragma': 'no-cache',
+            'Expires': '0'
+        },
+        'proxy': {},
+        'proxy_no': 0
+    }
+
+    if ENABLE_FREE_PROXY:
+        client['proxy'] = {'http': proxy_obj.get()}
+    elif PROXY != []:
+        client['proxy'] = {"http": PROXY[0], "https": PROXY[0]}
+    
+    return client
+
+
+def rotate_client(client):
+    """
+    Rotates the user agent and proxy after a failed request
+    """
+    client['headers']['User-Agent'] = user_agent_rotator.get_random_user_agent()
+
+    if ENABLE_FREE_PROXY:
+        client['proxy'] = {'http': proxy_obj.get()}
+
+    elif PROXY != []:
+        client['proxy_no'] = 0 if client['proxy_no'] == (len(PROXY)-1) else client['proxy_no'] + 1
+        client['proxy'] = {"http": PROXY[client['proxy_no']], "https": PROXY[client['proxy_no']]}
+
+
+def product_hook(obj):
+    """
+    Reduces every decoded JSON object to the fields used by the monitor as soon as it is built,
+    so the full object tree of a page is never held in memory
+    """
+    if 'handle' in obj:
+        # Product - keeps the first image only
+        images = obj.get('images')
+        image = images[0] if images else None
+        if image and image.startswith('//'):
+            image = 'https:' + image
+        return {
+            'id': obj['id'],
+            'title': obj['title'],
+            'image': image,
+            'handle': obj['handle'],
+            'updated_at': obj.get('updated_at'),
+            'variants': obj['variants']}
+    
+    if 'available' in obj:
+        # Variant
+        return {'id': obj['id'], 'title': obj['title'], 'available': obj['available']}
+    
+    if 'src' in obj:
+        # Image
+        return obj['src']
+    
+    return obj
+
+
+def decode_products(raw):
+    """
+    Decodes the products of a products.json page, or the single product of a /products/<handle>.js page
+    """
+    output = json.loads(raw, object_hook=product_hook)
+    # A single product has already been reduced by the hook, so it no longer has a products key
+    return output['products'] if 'products' in output else [output]
+
+
+def get_page(session, url, headers, proxy, cached):
+    """
+    Requests a single page and returns its cache entry along with its products.
+    Products are None when the page is unchanged since the last poll, in which case it is not decoded
+    """
+    headers = dict(headers)
+    if cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+
+    html = session.get(url, headers=headers, proxies=proxy, verify=False, timeout=20)
+    if html.status_code == 304:
+        return cached, None
+    
+    if html.status_code == 404:
+        # Products that are not published yet have no page
+        return {'count': 0, 'size': 0}, []
+
+    entry = {
+        'fingerprint': hashlib.blake2b(html.content, digest_size=16).digest(),
+        'etag': html.headers.get('ETag'),
+        'last_modified': html.headers.get('Last-Modified'),
+        'count': cached.get('count'),
+        'size': len(html.content)
+    }
+    if entry['fingerprint'] == cached.get('fingerprint'):
+        return entry, None
+
+    products = decode_products(html.content)
+    entry['count'] = len(products)
+    return entry, products
+
+
+async def fetch_page(session, store, url, key, cache, client, reserved=None):
+    """
+    Requests a page in the thread pool while respecting the store and host limits.
+    Hot pages and watched handles pass reserved, their own (host limits, executor), instead.
+    The page's cache entry is stored in cache under key
+    """
+    request = functools.partial(get_page, session, url, client['headers'], client['proxy'], cache.get(key, {}))
+    if reserved:
+        limits, executor = reserved
+        async with limits[store['host']]:
+            entry, products = await asyncio.get_running_loop().run_in_executor(executor, request)
+    else:
+        async with store['pages'], HOST_LIMITS[store['host']]:
+            entry, products = await asyncio.get_running_loop().run_in_executor(EXECUTOR, request)
+    
+    cache[key] = entry
+    return entry, products
+
+
+async def fetch_pages(session, store, client):
+    """
+    Requests products.json pages concurrently until a page that is not full is returned.
+    Returns the products of the pages that changed since the last poll
+    """
+    # Enough pages to hold the previous catalog plus one product, so a stable catalog completes in one round
+    batch_size = max(1, math.ceil((store['catalog_size'] + 1) / PAGE_LIMIT))
+    stats = {'pages': 0, 'skipped_pages': 0, 'bytes': 0, 'skipped_bytes': 0}
+    pages = []
+    catalog_size = 0
     page = 1
+
     while True:
-        html = s.get(url + f'?page={page}&limit=250', headers=headers, proxies=proxy, verify=False, timeout=20)
-        output = json.loads(html.text)['products']
-        if output == []:
-            break
-        else:
-            # Stores particular details in array
-            for product in output:
-                try:
-                    product_item = {
-                        'title': product['title'], 
-                        'image': product['images'][0]['src'], 
-                        'handle': product['handle'],
-                        'variants': product['variants']}
-                except:
-                    product_item = {
-                        'title': product['title'], 
-                        'image': None, 
-                        'handle': product['handle'],
-                        'variants': product['variants']}
-                items.append(product_item)
+        batch = await asyncio.gather(*[
+            fetch_page(session, store, store['url'] + f'?page={n}&limit={PAGE_LIMIT}', n, store['page_cache'], client)
+            for n in range(page, page + batch_size)])
+        for entry, output in batch:
+            catalog_size += entry['count']
+            stats['pages'] += 1
+            stats['bytes'] += entry['size']
+
+            if output is None:
+                # Unchanged page - skips decoding and diffing
+                stats['skipped_pages'] += 1
+                stats['skipped_bytes'] += entry['size']
+            else:
+                pages.append(output)
+
+            if entry['count'] < PAGE_LIMIT:
+                # A page that is not full is the last page of the catalog
+                for stale in [n for n in store['page_cache'] if n > page]:
+                    del store['page_cache'][stale]
+                store['catalog_size'] = catalog_size
+                store['stats'] = stats
+                logging.info(msg=f"{store['url']}: {stats['skipped_pages']}/{stats['pages']} pages and {stats['skipped_bytes']}/{stats['bytes']} bytes unchanged")
+                return pages
+            
             page += 1
+
+        # Catalog grew beyond the prediction - keeps going a full batch at a time
+        batch_size = MAX_CONCURRENT_PAGES
+
+
+async def scrape_site(session, store, client):
+    """
+    Scrapes the specified Shopify site and adds items to array
+    """
+    items = []
+
+    # Makes requests to site
+    for output in await fetch_pages(session, store, client):
+        items.extend(output)
     
-    logging.info(msg='Successfully scraped site')
-    s.close()
+    logging.info(msg='Successfully scraped ' + store['url'])
     return items
 
 
-def checker(item):
+async def scrape_hot_page(session, store, client):
     """
-    Determines whether the product status has changed
+    Scrapes the first page of the store's hot collection, returning no items when it is unchanged
     """
-    return item in INSTOCK
+    entry, products = await fetch_page(session, store, store['hot_url'] + f'?page=1&limit={PAGE_LIMIT}', 1, store['hot_cache'], client, (HOT_LIMITS, HOT_EXECUTOR))
+    return products or []
+
+
+async def scrape_watchlist(session, store, client):
+    """
+    Scrapes the single-product pages of every watched handle concurrently, returning the products that changed
+    """
+    items = []
+    for entry, products in await asyncio.gather(*[
+            fetch_page(session, store, store['base'] + f'/products/{handle}.js', handle, store['watch_cache'], client, (WATCH_LIMITS, WATCH_EXECUTOR))
+            for handle in store['watchlist']]):
+        items.extend(products or [])
+    
+    return items
 
 
 def discord_webhook(title, url, thumbnail, sizes):
@@ -91,7 +396,7 @@ def discord_webhook(title, url, thumbnail, sizes):
         "avatar_url": AVATAR_URL,
         "embeds": [{
             "title": title,
-            "url": URL.replace('.json', '/') + url, 
+            "url": url, 
             "thumbnail": {"url": thumbnail},
             "fields": fields,
             "color": int(COLOUR),
@@ -118,114 +423,225 @@ def remove_duplicates(mylist):
     return list(set(mylist))
 
 
-def comparitor(product, start):
-    product_item = [product['title'], product['image'], product['handle']]
-    # Collect all available sizes
-    available_sizes = []
-    for size in product['variants']:
-        if size['available']: # Makes an ATC link from the variant ID
-            available_sizes.append({'title': size['title'], 'url': '[ATC](' + URL[:URL.find('/', 10)] + '/cart/' + str(size['id']) + ':1)'})
-
-    
-    product_item.append(available_sizes) # Appends in field
-    
-    if available_sizes:
-        if not checker(product_item):
-            # If product is available but not stored - sends notification and stores
-            
-            INSTOCK.append(product_item)
-            
-            if start == 0:
-                print(product_item)
-                discord_webhook(
-                    title=product['title'],
-                    url=product['handle'],
-                    thumbnail=product['image'],
-                    sizes=available_sizes
-                )
-                logging.info(msg='Successfully sent Discord notification')
-
+def comparitor(store, product, start):
+    """
+    Updates the stored variant availability of a product and returns a notification for variants that have come back in stock
+    """
+    if INCREMENTAL and product['updated_at'] is not None:
+        # Skips products that have not been updated since they were last compared
+        # Single-product pages have no updated_at, so watched products are always compared
+        if store['watermarks'].get(product['id']) == product['updated_at']:
+            return
+        store['watermarks'][product['id']] = product['updated_at']
+        store['dirty'] = True
+
+    # Availability is kept as a bitmap over the product's variants, bit i being variants[i]
+    variants = product['variants']
+    variant_ids = array('q', [size['id'] for size in variants])
+    available = 0
+    for i, size in enumerate(variants):
+        if size['available']:
+            available |= 1 << i
+
+    stored = store['instock'].get(product['id'])
+    if stored is None:
+        previous = 0
+    elif stored[0] == variant_ids:
+        # Keeps the stored array so unchanged products do not hold a new one
+        variant_ids, previous = stored
     else:
-        if checker(product_item):
-            # If product is not available but stored - removes from store
-            INSTOCK.remove(product_item)
-
-
-def monitor():
+        # Variants were added or removed - realigns the previous bitmap to the new variant order
+        positions = {variant_id: i for i, variant_id in enumerate(stored[0])}
+        previous = 0
+        for i, variant_id in enumerate(variant_ids):
+            if variant_id in positions and stored[1] >> positions[variant_id] & 1:
+                previous |= 1 << i
+
+    store['instock'][product['id']] = (variant_ids, available)
+
+    # Variants that are available now but were not on the previous poll
+    restocked = available & ~previous
+    if restocked and start == 0:
+        # ATC links are only built when a notification is sent
+        restocked_sizes = []
+        for i, size in enumerate(variants):
+            if restocked >> i & 1: # Makes an ATC link from the variant ID
+                restocked_sizes.append({'title': size['title'], 'url': '[ATC](' + store['base'] + '/cart/' + str(size['id']) + ':1)'})
+
+        print(product['title'], [size['title'] for size in restocked_sizes])
+        return dict(
+            title=product['title'],
+            url=store['url'].replace('.json', '/') + product['handle'],
+            thumbnail=product['image'],
+            sizes=restocked_sizes
+        )
+
+
+async def process_items(store, items):
     """
-    Initiates the monitor
+    Compares scraped items against the store's state and sends notifications for restocks
     """
-    print('''\n-----------------------------------
---- SHOPIFY MONITOR HAS STARTED ---
------------------------------------\n''')
-    logging.info(msg='Successfully started monitor')
-
-    # Checks URL
-    if not check_url(URL):
-        print('Store URL not in correct format. Please ensure that it is a path pointing to a /products.json file')
-        logging.error(msg='Store URL formatting incorrect for: ' + str(URL))
-        return
+    loop = asyncio.get_running_loop()
+    to_discord = []
+    for product in items:
+        # Checks whether item status has changed, if no keywords are set or its title matches any keyword
+        if KEYWORD_MATCHER is None or KEYWORD_MATCHER.search(product['title'].lower()):
+            to_discord.append(comparitor(store, product, store['start']))
 
-    # Ensures that first scrape does not notify all products
-    start = 1
+    for product in to_discord:
+        if product:
+            await loop.run_in_executor(EXECUTOR, functools.partial(discord_webhook, **product))
+            logging.info(msg='Successfully sent Discord notification')
 
-    # Initialising proxy and headers
-    if ENABLE_FREE_PROXY:
-        proxy = {'http': proxy_obj.get()}
-    elif PROXY != []:
-        proxy_no = 0
-        proxy = {} if PROXY == [] else {"http": PROXY[proxy_no], "https": PROXY[proxy_no]}
-    else:
-        proxy = {}
 
-    headers = {
-        'User-Agent': user_agent_rotator.get_random_user_agent(),
-        'Cache-Control': 'no-cache, no-store, must-revalidate',
-        'Pragma': 'no-cache',
-        'Expires': '0'
-    }
+async def save_states():
+    """
+    Saves the state at most every SAVE_INTERVAL seconds when any store's watermarks have moved.
+    The snapshot is taken on the event loop and written to disk in the thread pool
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(float(SAVE_INTERVAL))
+        if any(store['dirty'] for store in STORES):
+            for store in STORES:
+                store['dirty'] = False
+            try:
+                await loop.run_in_executor(EXECUTOR, save_state, snapshot_state(STORES))
+            except Exception as e:
+                print(f"Exception found: {traceback.format_exc()}")
+                logging.error(e)
+
+
+async def monitor_store(session, store, client, offset):
+    """
+    Polls the full catalog of a single store until the process is stopped
+    """
+    # Spreads the first polls of every store across the delay
+    await asyncio.sleep(offset)
 
     while True:
         try:
             # Makes request to site and stores products 
-            items = scrape_site(URL, proxy, headers)
-            for product in items:
+            items = await scrape_site(session, store, client)
+            await process_items(store, items)
 
-                if KEYWORDS == []:
-                    # If no keywords set, checks whether item status has changed
-                    comparitor(product, start)
+            # Allows changes to be notified
+            store['start'] = 0
 
-                else:
-                    # For each keyword, checks whether particular item status has changed
-                    for key in KEYWORDS:
-                        if key.lower() in product['title'].lower():
-                            comparitor(product, start)
+        except rq.exceptions.RequestException as e:
+            logging.error(e)
+            logging.info('Rotating headers and proxy')
+            rotate_client(client)
 
-            # Allows changes to be notified
-            start = 0
+        except Exception as e:
+            print(f"Exception found: {traceback.format_exc()}")
+            logging.error(e)   
+        
+        # User set delay
+        await asyncio.sleep(float(DELAY))
+
+
+async def monitor_hot(session, store, client, offset):
+    """
+    Polls the first page of a store's hot collection until the process is stopped.
+    Shares the store's state with the full catalog scan, which alone allows changes to be notified
+    """
+    await asyncio.sleep(offset)
+
+    while True:
+        try:
+            items = await scrape_hot_page(session, store, client)
+            await process_items(store, items)
 
         except rq.exceptions.RequestException as e:
             logging.error(e)
             logging.info('Rotating headers and proxy')
+            rotate_client(client)
 
-            # Rotates headers
-            headers['User-Agent'] = user_agent_rotator.get_random_user_agent()
-            
-            if ENABLE_FREE_PROXY:
-                proxy = {'http': proxy_obj.get()}
+        except Exception as e:
+            print(f"Exception found: {traceback.format_exc()}")
+            logging.error(e)   
+        
+        await asyncio.sleep(float(HOT_DELAY))
 
-            elif PROXY != []:
-                proxy_no = 0 if proxy_no == (len(PROXY)-1) else proxy_no + 1
-                proxy = {"http": PROXY[proxy_no], "https": PROXY[proxy_no]}
+
+async def monitor_watchlist(session, store, client, offset):
+    """
+    Polls the single-product pages of a store's watched handles until the process is stopped.
+    Shares the store's state with the full catalog scan, which alone allows changes to be notified
+    """
+    await asyncio.sleep(offset)
+
+    while True:
+        try:
+            items = await scrape_watchlist(session, store, client)
+            await process_items(store, items)
+
+        except rq.exceptions.RequestException as e:
+            logging.error(e)
+            logging.info('Rotating headers and proxy')
+            rotate_client(client)
 
         except Exception as e:
             print(f"Exception found: {traceback.format_exc()}")
             logging.error(e)   
         
-        # User set delay
-        time.sleep(float(DELAY))
+        await asyncio.sleep(float(WATCHLIST_DELAY))
+
+
+async def monitor():
+    """
+    Initiates the monitor
+    """
+    print('''\n-----------------------------------
+--- SHOPIFY MONITOR HAS STARTED ---
+-----------------------------------\n''')
+    logging.info(msg='Successfully started monitor')
+
+    # Checks URLs
+    stores = []
+    for url in (URLS if URLS != [] else [URL]):
+        if not check_url(url):
+            print('Store URL not in correct format. Please ensure that it is a path pointing to a /products.json file')
+            logging.error(msg='Store URL formatting incorrect for: ' + str(url))
+        else:
+            stores.append(create_store(url))
+
+    if stores == []:
+        return
+
+    if INCREMENTAL:
+        load_state(stores)
+    STORES.extend(stores)
+
+    # Politeness limit shared by every store on the same host, plus a slot for every hot page and watched handle on it
+    hot, watched = {}, {}
+    for store in stores:
+        HOST_LIMITS.setdefault(store['host'], asyncio.Semaphore(PER_HOST_LIMIT))
+        hot[store['host']] = hot.get(store['host'], 0) + bool(store['hot_url'])
+        watched[store['host']] = watched.get(store['host'], 0) + len(store['watchlist'])
+    for host in HOST_LIMITS:
+        HOT_LIMITS[host] = asyncio.Semaphore(max(1, hot[host]))
+        WATCH_LIMITS[host] = asyncio.Semaphore(max(1, watched[host]))
+
+    # Pooled session, headers and proxy shared by every store
+    session = create_session(len(HOST_LIMITS), max(hot[host] + watched[host] for host in HOST_LIMITS))
+    client = create_client()
+
+    tasks = []
+    for i, store in enumerate(stores):
+        tasks.append(monitor_store(session, store, client, float(DELAY) * i / len(stores)))
+        if store['hot_url']:
+            tasks.append(monitor_hot(session, store, client, float(HOT_DELAY) * i / len(stores)))
+        if store['watchlist']:
+            tasks.append(monitor_watchlist(session, store, client, float(WATCHLIST_DELAY) * i / len(stores)))
+
+    if INCREMENTAL:
+        tasks.append(save_states())
+
+    await asyncio.gather(*tasks)
 
 
 if __name__ == '__main__':
     urllib3.disable_warnings()
-    monitor()
\ No newline at end of file
+    asyncio.run(monitor())
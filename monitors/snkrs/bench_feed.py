@@ -0,0 +1,138 @@
+"""
+Benchmark for processing the threads feed
+Compares the previous per-keyword loops with a sku scan per GTIN against the single-pass feed processor
+Usage: python bench_feed.py [saved threads feed page]
+"""
+import json
+import os
+import random
+import sys
+import time
+import traceback
+
+from locations import LEVELS, process_feed
+
+FIXTURE = 'feed_fixture.json'
+RUNS = 20
+LOCATION = 'GB'
+KEYWORDS = ['dunk', 'jordan 1', 'yeezy', 'air max', 'sacai', 'travis', 'off-white', 'union', 'fragment', 'panda']
+
+
+def build_fixture(path, items=160, sizes=26):
+    """
+    Saves a threads feed with launch products, each with a full size run
+    """
+    random.seed(1)
+    objects = []
+    for i in range(items):
+        name = random.choice(['Dunk Low', 'Air Jordan 1 High OG', 'Air Max 1', 'Air Force 1', 'Blazer Mid', 'Vomero 5'])
+        style = f'DD{1000 + i}-{100 + i % 900}'
+        skus = [{'id': f'{i}-{s}', 'gtin': f'0{194500000000 + i * 100 + s}', 'nikeSize': str(3.5 + s * 0.5), 'countrySpecifications': []} for s in range(sizes)]
+        objects.append({
+            'id': f'thread-{i}',
+            'publishedContent': {'nodes': [{'nodes': [{'properties': {'squarishURL': f'https://static.nike.com/a/images/{style}.jpg'}}]}]},
+            'productInfo': [{
+                'availability': {'available': True},
+                'merchProduct': {'status': 'ACTIVE', 'labelName': name, 'styleColor': style},
+                'merchPrice': {'currentPrice': 109.99},
+                'productContent': {'fullTitle': f"Nike {name} '{style}'", 'colorDescription': 'White/Black', 'slug': f'{name.lower().replace(" ", "-")}-{style.lower()}'},
+                'skus': skus,
+                'availableGtins': [{'gtin': sku['gtin'], 'available': random.random() < 0.8, 'level': random.choice(list(LEVELS))} for sku in skus]
+            }]
+        })
+
+    with open(path, 'w') as f:
+        json.dump({'objects': objects}, f)
+
+
+def old_update_gtins(ITEMS, product):
+    """
+    Previous behaviour: scans every sku to find the size of each GTIN and builds the string by concatenation
+    """
+    first = 0
+    sizes = ''
+    for k in product['availableGtins']:
+        if k['available'] == True:
+            previous = ITEMS.get(k['gtin'])
+            ITEMS[k['gtin']] = k['level']
+            if previous is not None and LEVELS.get(k['level'], 0) <= LEVELS.get(previous, 0):
+                continue
+
+            level = str(k['level']) if previous is None else str(previous) + ' -> ' + str(k['level'])
+            for s in product['skus']:
+                if s['gtin'] == k['gtin']:
+                    if first == 0:
+                        sizes = str(s['nikeSize']) + ': ' + level
+                        first = 1
+                    else:
+                        sizes += '\n' + str(s['nikeSize']) + ': ' + level
+                    break
+        else:
+            ITEMS.pop(k['gtin'], None)
+
+    return sizes
+
+
+def old_process_feed(ITEMS, output, LOCATION, KEYWORDS, start):
+    """
+    Previous behaviour: separate loops for no keywords and for each keyword
+    """
+    to_discord = []
+    for item in output['objects']:
+        try:
+            for product in item['productInfo']:
+                if (product['availability']['available'] == True) and (product['merchProduct']['status'] == 'ACTIVE'):
+                    if KEYWORDS == []:
+                        sizes = old_update_gtins(ITEMS, product)
+                        if sizes != '' and start == 0:
+                            to_discord.append(dict(title=product['productContent']['fullTitle'], sizes=sizes))
+
+                    else:
+                        for key in KEYWORDS:
+                            if key.lower() in product['merchProduct']['labelName'].lower() or key.lower() in product['productContent']['colorDescription'].lower():
+                                sizes = old_update_gtins(ITEMS, product)
+                                if sizes != '' and start == 0:
+                                    to_discord.append(dict(title=product['productContent']['fullTitle'], sizes=sizes))
+        except KeyError:
+            pass
+
+        except:
+            print(traceback.format_exc())
+
+    return to_discord
+
+
+def measure(process, output, keywords, warm):
+    """
+    Returns the best time in milliseconds to process the feed, starting from empty or already populated stock
+    """
+    best = None
+    for _ in range(RUNS):
+        items = {}
+        if warm:
+            process(items, output, LOCATION, keywords, 1)
+        t = time.perf_counter()
+        process(items, output, LOCATION, keywords, 1)
+        elapsed = time.perf_counter() - t
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else FIXTURE
+    if not os.path.exists(path):
+        print(f'[INFO] Saving fixture to {path}')
+        build_fixture(path)
+
+    with open(path) as f:
+        output = json.load(f)
+
+    print('=' * 80)
+    print(f'Processing {len(output["objects"])} feed items from {path}, best of {RUNS} runs')
+    print('=' * 80)
+    print(f'   {"keywords":>8}   {"stock":>6}   {"old loops":>12}   {"single pass":>12}')
+    for keywords in [[], KEYWORDS]:
+        for warm in [False, True]:
+            old = measure(old_process_feed, output, keywords, warm)
+            new = measure(process_feed, output, keywords, warm)
+            print(f'   {len(keywords):>8}   {"warm" if warm else "empty":>6}   {old:>9.2f} ms   {new:>9.2f} ms   {old / new:4.1f}x')
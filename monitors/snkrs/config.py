@@ -5,6 +5,15 @@ WEBHOOK = ""
 LOCATION = ""
 LANGUAGE = ""
 
+# Multiple regions can be monitored from one process by listing "<country code> <language code>" pairs
+# LOCATION and LANGUAGE are ignored when REGIONS is set
+# E.G. REGIONS = ["GB en-GB", "US en", "JP ja"]
+REGIONS = []
+
+# --------------------- REQUEST BUDGET ---------------------
+# Maximum number of feed requests per second across all regions (0 for no limit)
+REQUESTS_PER_SECOND = 10
+
 # --------------------- FREE PROXY ---------------------
 # A single or multiple locations can be added in the array (e.g. ["GB"] or ["GB", "US"])
 ENABLE_FREE_PROXY = False
@@ -14,6 +23,26 @@ FREE_PROXY_LOCATION = ["GB"]
 # Delay between site requests
 DELAY = 5
 
+# --------------------- FEED PAGES ---------------------
+# Number of feed pages (50 products each) requested at the same time
+# A page that has not responded within PAGE_DEADLINE seconds is skipped until the next cycle
+PAGES = 4
+PAGE_DEADLINE = 10
+
+# --------------------- LAUNCH CALENDAR ---------------------
+# The full feed is scanned every FEED_INTERVAL seconds (0 to scan it every cycle)
+# Upcoming launches found in the feed are polled directly from LAUNCH_BEFORE seconds before their start
+# until LAUNCH_AFTER seconds after it, every LAUNCH_DELAY seconds
+FEED_INTERVAL = 60
+LAUNCH_BEFORE = 60
+LAUNCH_AFTER = 600
+LAUNCH_DELAY = 1
+
+# --------------------- CHILE BROWSER ---------------------
+# Chile is loaded through a headless browser that is kept open between polls
+# The browser is closed and relaunched every BROWSER_RECYCLE seconds (0 to never recycle)
+BROWSER_RECYCLE = 3600
+
 # --------------------- OPTIONAL PROXY ---------------------
 # Proxies must follow this format: "<proxy>:<port>" OR "<proxy_username>:<proxy_password>@<proxy_domain>:<port>")
 # If you want to use multiple proxies, please create an array
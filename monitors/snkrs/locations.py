@@ -2,8 +2,14 @@
 from bs4 import BeautifulSoup
 import requests
 import json
+import logging
+import threading
+import time
 import traceback
 
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
 import asyncio
 from pyppeteer import launch
 from pyppeteer_stealth import stealth
@@ -15,29 +21,285 @@ ___standard_api___ = [
     'ES', 'SE', 'CH', 'TR', 'AE', 'VN', 'JP' 
 ]
 
+# Products per page of the threads feed
+FEED_COUNT = 50
+
+# Pooled session reused across polls, regions and concurrent feed pages
+SESSION = requests.Session()
+SESSION.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=32))
+
+# Maximum number of feed requests per second across all regions (0 for no limit)
+REQUESTS_PER_SECOND = 0
+REQUEST_LOCK = threading.Lock()
+NEXT_REQUEST = 0.0
+
+# Stock levels reported for each GTIN, lowest first
+LEVELS = {'OOS': 0, 'LOW': 1, 'MEDIUM': 2, 'HIGH': 3}
+
+
+# Headless browser reused across Chile polls
+# Driven on its own event loop so polls can run from any thread
+BROWSER = None
+BROWSER_LAUNCHED = 0.0
+BROWSER_LOOP = asyncio.new_event_loop()
+BROWSER_LOCK = threading.Lock()
+
+# Seconds before the browser is closed and relaunched (0 to never recycle)
+BROWSER_RECYCLE = 0
+
+
+async def get_browser():
+    """
+    Returns the running browser, launching a new one when there is none or it is due to be recycled
+    """
+    global BROWSER, BROWSER_LAUNCHED
+
+    if BROWSER is not None and BROWSER_RECYCLE and time.monotonic() - BROWSER_LAUNCHED > BROWSER_RECYCLE:
+        logging.info(msg='Recycling browser')
+        await close_browser()
+
+    if BROWSER is None:
+        # Signal handlers can only be installed from the main thread
+        BROWSER = await launch(handleSIGINT=False, handleSIGTERM=False, handleSIGHUP=False)
+        BROWSER_LAUNCHED = time.monotonic()
+        logging.info(msg='Launched browser')
+    return BROWSER
+
+
+async def close_browser():
+    """
+    Closes the browser so the next poll launches a fresh one
+    """
+    global BROWSER
+
+    browser, BROWSER = BROWSER, None
+    if browser is not None:
+        try:
+            await browser.close()
+        except Exception as e:
+            logging.error(e)
+
 
 async def get_content(url, user_agent, proxy):
-    browser = await launch()
-    page = await browser.newPage()
-    await stealth(page)
-    await page.emulate({
-        'userAgent': user_agent,
-        'viewport': {
-            'width': 414,
-            'height': 736,
-            'deviceScaleFactor': 3,
-            'isMobile': True,
-            'hasTouch': True,
-            'isLandscape': False
-        }
-    })
-    await page.goto(url)
-    content = await page.content()
-    await page.close()
-    return content
-
-
-def standard_api(ITEMS, LOCATION, LANGUAGE, user_agent, proxy, KEYWORDS, start):
+    browser = await get_browser()
+    try:
+        page = await browser.newPage()
+        try:
+            await stealth(page)
+            await page.emulate({
+                'userAgent': user_agent,
+                'viewport': {
+                    'width': 414,
+                    'height': 736,
+                    'deviceScaleFactor': 3,
+                    'isMobile': True,
+                    'hasTouch': True,
+                    'isLandscape': False
+                }
+            })
+            await page.goto(url)
+            return await page.content()
+        finally:
+            await page.close()
+
+    except Exception:
+        # A crashed or hung browser is replaced on the next poll
+        await close_browser()
+        raise
+
+
+def fetch_content(url, user_agent, proxy):
+    """
+    Loads a page in the shared browser, blocking until its content is returned
+    """
+    with BROWSER_LOCK:
+        return BROWSER_LOOP.run_until_complete(get_content(url, user_agent, proxy))
+
+
+def update_gtins(ITEMS, product):
+    """
+    Updates the stored level of every GTIN of a product and returns the sizes that appeared or moved to a higher level
+    """
+    size_names = None
+    sizes = []
+    for k in product['availableGtins']:
+        if k['available'] == True:
+            previous = ITEMS.get(k['gtin'])
+            ITEMS[k['gtin']] = k['level']
+            if previous is not None and LEVELS.get(k['level'], 0) <= LEVELS.get(previous, 0):
+                continue
+
+            # Sizes are only looked up when a GTIN has changed
+            if size_names is None:
+                size_names = {s['gtin']: s['nikeSize'] for s in product['skus']}
+
+            if k['gtin'] in size_names:
+                level = str(k['level']) if previous is None else str(previous) + ' -> ' + str(k['level'])
+                sizes.append(str(size_names[k['gtin']]) + ': ' + level)
+        else:
+            ITEMS.pop(k['gtin'], None)
+
+    return '\n'.join(sizes)
+
+
+def matches_keywords(product, KEYWORDS):
+    """
+    Checks whether any keyword appears in the product's name or colourway
+    """
+    if KEYWORDS == []:
+        return True
+
+    text = (product['merchProduct']['labelName'] + '\n' + product['productContent']['colorDescription']).lower()
+    return any(key.lower() in text for key in KEYWORDS)
+
+
+def process_feed(ITEMS, output, LOCATION, KEYWORDS, start):
+    """
+    Updates stock from a single page of the threads feed and returns the products to notify
+    """
+    to_discord = []
+    for item in output['objects']:
+        try:
+            for product in item['productInfo']:
+                if (product['availability']['available'] == True) and (product['merchProduct']['status'] == 'ACTIVE') and matches_keywords(product, KEYWORDS):
+                    sizes = update_gtins(ITEMS, product)
+
+                    if sizes != '' and start == 0:
+                        print('Sending notification to Discord...')
+                        to_discord.append(dict(
+                            title=product['productContent']['fullTitle'],
+                            description=product['productContent']['colorDescription'],
+                            url='https://www.nike.com/' + LOCATION + '/launch/t/' + product['productContent']['slug'],
+                            thumbnail=item['publishedContent']['nodes'][0]['nodes'][0]['properties']['squarishURL'],
+                            price=str(product['merchPrice']['currentPrice']),
+                            style_code=str(product['merchProduct']['styleColor']),
+                            sizes=sizes))
+        except KeyError:
+            pass
+
+        except:
+            print(traceback.format_exc())
+
+    return to_discord
+
+
+def reserve():
+    """
+    Reserves the next slot in the global request budget and returns when it starts
+    """
+    global NEXT_REQUEST
+
+    with REQUEST_LOCK:
+        now = time.monotonic()
+        if not REQUESTS_PER_SECOND:
+            return now
+
+        slot = max(now, NEXT_REQUEST)
+        NEXT_REQUEST = slot + 1.0 / REQUESTS_PER_SECOND
+    return slot
+
+
+def get_feed_page(anchor, LOCATION, LANGUAGE, headers, proxy, timeout, THREADS=None):
+    """
+    Requests a single page of the threads feed, or only the given threads
+    """
+    url = f'https://api.nike.com/product_feed/threads/v3/?anchor={anchor}&count={FEED_COUNT}&filter=marketplace%28{LOCATION}%29&filter=language%28{LANGUAGE}%29&filter=channelId%28010794e5-35fe-4e32-aaff-cd2c74f89d61%29&filter=exclusiveAccess%28true%2Cfalse%29'
+    if THREADS:
+        url += f'&filter=id%28{"%2C".join(THREADS)}%29'
+    html = SESSION.get(url=url, timeout=timeout, verify=False, headers=headers, proxies=proxy)
+    return json.loads(html.text)
+
+
+def get_feed_slot(slot, cancelled, *args):
+    """
+    Waits for a page's slot in the request budget, then requests it unless the cycle has already given up on it
+    """
+    time.sleep(max(0, slot - time.monotonic()))
+    if cancelled.is_set():
+        return None
+    return get_feed_page(*args)
+
+
+def fetch_feed(LOCATION, LANGUAGE, headers, proxy, PAGES, PAGE_DEADLINE, THREADS=None):
+    """
+    Requests the anchor pages of the threads feed concurrently and returns them in anchor order.
+    When THREADS is given, only those threads are requested, FEED_COUNT per page.
+    Each page's deadline starts from its slot in the request budget, so queueing behind other regions does not count against it.
+    Pages that fail or miss the deadline are skipped this cycle; the error is only raised when every page fails
+    """
+    if THREADS:
+        batches = [THREADS[i:i + FEED_COUNT] for i in range(0, len(THREADS), FEED_COUNT)]
+        PAGES = len(batches)
+    else:
+        batches = [None] * PAGES
+
+    slots = [reserve() for batch in batches]
+    cancelled = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=PAGES)
+    futures = [
+        executor.submit(get_feed_slot, slot, cancelled, 0 if THREADS else page * FEED_COUNT, LOCATION, LANGUAGE, headers, proxy, PAGE_DEADLINE, batch) 
+        for page, (slot, batch) in enumerate(zip(slots, batches))]
+    done, late = wait(futures, timeout=max(slots) + PAGE_DEADLINE - time.monotonic())
+
+    # Late pages that have not been sent are cancelled, ones in flight end on their own timeout
+    cancelled.set()
+    for future in late:
+        future.cancel()
+    executor.shutdown(wait=False)
+
+    outputs = []
+    error = None
+    for page, future in enumerate(futures):
+        if future not in done:
+            logging.info(msg=f'Skipping feed anchor {page * FEED_COUNT} this cycle: no response within {PAGE_DEADLINE}s')
+        elif future.exception() is not None:
+            logging.error(msg=f'Skipping feed anchor {page * FEED_COUNT} this cycle: {future.exception()}')
+            error = error or future.exception()
+        else:
+            outputs.append(future.result())
+    
+    if outputs == [] and error is not None:
+        raise error
+    return outputs
+
+
+def launch_start(product):
+    """
+    Returns the launch start of a product as a timestamp, or None if the feed has no launch date for it
+    """
+    date = product.get('launchView', {}).get('startEntryDate') or product['merchProduct'].get('commerceStartDate')
+    if not date:
+        return None
+    return datetime.fromisoformat(date.replace('Z', '+00:00')).timestamp()
+
+
+def index_launches(LAUNCHES, output, now, LAUNCH_AFTER, KEYWORDS):
+    """
+    Adds the threads of a feed page that match the keywords and have not launched yet to the launch index
+    """
+    for item in output['objects']:
+        try:
+            for product in item['productInfo']:
+                if not matches_keywords(product, KEYWORDS):
+                    continue
+
+                start = launch_start(product)
+                if start is not None and start + LAUNCH_AFTER > now:
+                    LAUNCHES[item['id']] = start
+        except (KeyError, ValueError):
+            pass
+
+
+def armed_threads(LAUNCHES, now, LAUNCH_BEFORE, LAUNCH_AFTER):
+    """
+    Drops launches that are over and returns the threads starting within LAUNCH_BEFORE seconds or still launching
+    """
+    for thread in [thread for thread, start in LAUNCHES.items() if start + LAUNCH_AFTER <= now]:
+        del LAUNCHES[thread]
+    return [thread for thread, start in LAUNCHES.items() if start - LAUNCH_BEFORE <= now]
+
+
+def standard_api(ITEMS, LOCATION, LANGUAGE, user_agent, proxy, KEYWORDS, start, PAGES=4, PAGE_DEADLINE=20, LAUNCHES=None, LAUNCH_AFTER=0, THREADS=None):
     headers = {
         'accept': '*/*',
         'accept-encoding': 'gzip, deflate, br',
@@ -58,98 +320,12 @@ def standard_api(ITEMS, LOCATION, LANGUAGE, user_agent, proxy, KEYWORDS, start):
     }
     to_discord = []
 
-    anchor = 0
-    while anchor < 160:
-        url = f'https://api.nike.com/product_feed/threads/v3/?anchor={anchor}&count=50&filter=marketplace%28{LOCATION}%29&filter=language%28{LANGUAGE}%29&filter=channelId%28010794e5-35fe-4e32-aaff-cd2c74f89d61%29&filter=exclusiveAccess%28true%2Cfalse%29'
-        html = requests.get(url=url, timeout=20, verify=False, headers=headers, proxies=proxy)
-        output = json.loads(html.text)
-
-        # Stores details in array
-        for item in output['objects']:
-            try:
-                for product in item['productInfo']:
-                    if (product['availability']['available'] == True) and (product['merchProduct']['status'] == 'ACTIVE'):
-                        if KEYWORDS == []:
-                            first = 0
-                            sizes = ''
-                            for k in product['availableGtins']:
-                                stored = [product['productContent']['fullTitle'], product['productContent']['colorDescription'], k['gtin']]
-                                if k['available'] == True:
-                                    if stored in ITEMS:
-                                        pass
-                                    else:
-                                        ITEMS.append(stored)
-                                        
-                                        for s in product['skus']:
-                                            if first == 0:
-                                                if s['gtin'] == k['gtin']:
-                                                    sizes = str(s['nikeSize']) + ': ' + str(k['level'])
-                                                    first = 1
-                                                    break
-                                            else:
-                                                if s['gtin'] == k['gtin']:
-                                                    sizes += '\n' + str(s['nikeSize']) + ': ' + str(k['level'])
-                                                    break
-                                else:
-                                    if stored in ITEMS:
-                                        ITEMS.remove(stored)
-                            
-                            if sizes != '' and start == 0:
-                                print('Sending notification to Discord...')
-                                to_discord.append(dict(
-                                    title=product['productContent']['fullTitle'],
-                                    description=product['productContent']['colorDescription'],
-                                    url='https://www.nike.com/' + LOCATION + '/launch/t/' + product['productContent']['slug'],
-                                    thumbnail=item['publishedContent']['nodes'][0]['nodes'][0]['properties']['squarishURL'],
-                                    price=str(product['merchPrice']['currentPrice']),
-                                    style_code=str(product['merchProduct']['styleColor']),
-                                    sizes=sizes))
-
-                        else:
-                            for key in KEYWORDS:
-                                if key.lower() in product['merchProduct']['labelName'].lower() or key.lower() in product['productContent']['colorDescription'].lower():
-                                    first = 0
-                                    sizes = ''
-                                    for k in product['availableGtins']:
-                                        stored = [product['productContent']['fullTitle'], product['productContent']['colorDescription'], k['gtin']]
-                                        if k['available'] == True:
-                                            if stored in ITEMS:
-                                                pass
-                                            else:
-                                                ITEMS.append(stored)
-                                                
-                                                for s in product['skus']:
-                                                    if first == 0:
-                                                        if s['gtin'] == k['gtin']:
-                                                            sizes = str(s['nikeSize']) + ': ' + str(k['level'])
-                                                            first = 1
-                                                            break
-                                                    else:
-                                                        if s['gtin'] == k['gtin']:
-                                                            sizes += '\n' + str(s['nikeSize']) + ': ' + str(k['level'])
-                                                            break
-                                        else:
-                                            if stored in ITEMS:
-                                                ITEMS.remove(stored)
-                                    
-                                    if sizes != '' and start == 0:
-                                        print('Sending notification to Discord...')
-                                        to_discord.append(dict(
-                                            title=product['productContent']['fullTitle'],
-                                            description=product['productContent']['colorDescription'],
-                                            url='https://www.nike.com/' + LOCATION + '/launch/t/' + product['productContent']['slug'],
-                                            thumbnail=item['publishedContent']['nodes'][0]['nodes'][0]['properties']['squarishURL'],
-                                            price=str(product['merchPrice']['currentPrice']),
-                                            style_code=str(product['merchProduct']['styleColor']),
-                                            sizes=sizes))
-            except KeyError:
-                pass
-
-            except:
-                print(traceback.format_exc())
+    now = time.time()
+    for output in fetch_feed(LOCATION, LANGUAGE, headers, proxy, PAGES, PAGE_DEADLINE, THREADS):
+        to_discord += process_feed(ITEMS, output, LOCATION, KEYWORDS, start)
+        if LAUNCHES is not None and not THREADS:
+            index_launches(LAUNCHES, output, now, LAUNCH_AFTER, KEYWORDS)
 
-        anchor += 50
-        
     return to_discord
 
     
@@ -186,7 +362,7 @@ def brazil(ITEMS, LOCATION, LANGUAGE, user_agent, proxy, KEYWORDS, start):
                 sizes=None
             )
 
-            if item in ITEMS:
+            if item['url'] in ITEMS:
                 pass
             elif start == 0:
                 to_discord.append(item)
@@ -205,7 +381,7 @@ def brazil(ITEMS, LOCATION, LANGUAGE, user_agent, proxy, KEYWORDS, start):
                         sizes=None
                     )
 
-                    if item in ITEMS:
+                    if item['url'] in ITEMS:
                         pass
                     elif start == 0:
                         to_discord.append(item)
@@ -218,7 +394,7 @@ def brazil(ITEMS, LOCATION, LANGUAGE, user_agent, proxy, KEYWORDS, start):
 def chile(ITEMS, LOCATION, LANGUAGE, user_agent, proxy, KEYWORDS, start):
     url = 'https://www.nike.cl/api/catalog_system/pub/products/search?&_from=0&_to=49'
     to_discord = []
-    html = asyncio.get_event_loop().run_until_complete(get_content(url, user_agent, proxy))
+    html = fetch_content(url, user_agent, proxy)
     html = html.replace('</pre></body></html>','').replace('<html><head></head><body><pre style="word-wrap: break-word; white-space: pre-wrap;">','')
     html = '{"data": ' + html + '}'
 
@@ -230,10 +406,10 @@ def chile(ITEMS, LOCATION, LANGUAGE, user_agent, proxy, KEYWORDS, start):
         sizes = ''
         s = 0
         for size in product['items']:
-            item = [product['productName'], product['productReferenceCode'], size['name']]
+            item = (product['productName'], product['productReferenceCode'], size['name'])
             if int(size['sellers'][0]['commertialOffer']['AvailableQuantity']) > 0:
                 if item not in ITEMS:
-                    ITEMS.append(item)
+                    ITEMS[item] = size['sellers'][0]['commertialOffer']['AvailableQuantity']
                     if s == 0:
                         sizes = str(size['name']) + ': [' + str(size['sellers'][0]['commertialOffer']['AvailableQuantity']) + ' Available' +  f']({size["sellers"][0]["addToCartLink"]})'
                         s = 1
@@ -241,8 +417,7 @@ def chile(ITEMS, LOCATION, LANGUAGE, user_agent, proxy, KEYWORDS, start):
                         sizes += '\n' + str(size['name']) + ': [' + str(size['sellers'][0]['commertialOffer']['AvailableQuantity']) + ' Available' + f']({size["sellers"][0]["addToCartLink"]})'
             
             else:
-                if item in ITEMS:
-                    ITEMS.remove(item)
+                ITEMS.pop(item, None)
         
         if sizes != '' and start == 0:
             if KEYWORDS == []:
@@ -5,6 +5,7 @@ import requests as rq
 import urllib3
 from fp.fp import FreeProxy
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import time
 
@@ -13,7 +14,7 @@ import logging
 import traceback
 
 import locations
-from config import WEBHOOK, LOCATION, LANGUAGE, ENABLE_FREE_PROXY, FREE_PROXY_LOCATION, DELAY, PROXY, KEYWORDS, USERNAME, AVATAR_URL, COLOUR
+from config import WEBHOOK, LOCATION, LANGUAGE, ENABLE_FREE_PROXY, FREE_PROXY_LOCATION, DELAY, PROXY, KEYWORDS, USERNAME, AVATAR_URL, COLOUR, PAGES, PAGE_DEADLINE, REGIONS, REQUESTS_PER_SECOND, BROWSER_RECYCLE, FEED_INTERVAL, LAUNCH_BEFORE, LAUNCH_AFTER, LAUNCH_DELAY
 
 
 logging.basicConfig(filename='snkrs-monitor.log', filemode='a', format='%(asctime)s - %(name)s - %(message)s', level=logging.DEBUG)
@@ -26,12 +27,51 @@ if ENABLE_FREE_PROXY:
     proxy_obj = FreeProxy(country_id=FREE_PROXY_LOCATION, rand=True)
 
 
-INSTOCK = []
+INSTOCK = {}  # {(location, language): {gtin: level}} for the standard API, keyed by size for other regions
+LAUNCHES = {}  # {(location, language): {thread id: launch start timestamp}}
 
-def discord_webhook(title, description, url, thumbnail, price, style_code, sizes):
+def truncate(value, limit):
     """
-    Sends a Discord webhook notification to the specified webhook URL
+    Cuts a list of lines down to the limit at a line break
     """
+    if value is None or len(value) <= limit:
+        return value
+    return value[:value.rfind('\n', 0, limit - 4)] + '\n...'
+
+
+def size_fields(sizes, limit=1024, total=5000):
+    """
+    Gives each region's sizes their own field within Discord's 1024 character field limit.
+    Regions past the overall embed limit are counted instead of listed
+    """
+    if len(sizes) == 1:
+        return [{'name': 'Sizes', 'value': truncate(sizes[0][1], limit)}]
+
+    fields = []
+    used = 0
+    for n, (region, value) in enumerate(sizes):
+        value = truncate(value, limit)
+        if len(fields) == 20 or used + len(value or '') > total:
+            fields.append({'name': 'Sizes', 'value': f'{len(sizes) - n} more regions not shown'})
+            break
+        fields.append({'name': f'Sizes ({region})', 'value': value})
+        used += len(value or '')
+
+    return fields
+
+
+def discord_webhook(title, description, url, thumbnail, price, style_code, sizes, regions=None):
+    """
+    Sends a Discord webhook notification to the specified webhook URL.
+    sizes is a list of (region, sizes) pairs
+    """
+    fields = [
+        {'name': 'Price', 'value': price},
+        {'name': 'Style Code', 'value': style_code}
+    ] + size_fields(sizes)
+    if regions:
+        fields.append({'name': 'Regions', 'value': ', '.join(regions)})
+
     data = {
         'username': USERNAME,
         'avatar_url':  AVATAR_URL,
@@ -43,11 +83,7 @@ def discord_webhook(title, description, url, thumbnail, price, style_code, sizes
             'color': int(COLOUR),
             'footer': {'text': 'Developed by GitHub:yasserqureshi1'},
             'timestamp': str(datetime.utcnow()),
-            'fields': [
-                {'name': 'Price', 'value': price},
-                {'name': 'Style Code', 'value': style_code},
-                {'name': 'Sizes', 'value': sizes}
-            ]
+            'fields': fields
         }]
     }
     
@@ -62,6 +98,39 @@ def discord_webhook(title, description, url, thumbnail, price, style_code, sizes
         logging.info(msg="Payload delivered successfully, code {}.".format(result.status_code))
 
 
+def scrape_region(location, language, user_agent, proxy, start, threads=None):
+    """
+    Scrapes a single region with its own stock state and returns the products to notify.
+    Standard API regions scan the full feed, or only the given launch threads
+    """
+    items = INSTOCK.setdefault((location, language), {})
+    if location in locations.___standard_api___:
+        return locations.standard_api(items, location, language, user_agent, proxy, KEYWORDS, start, PAGES, PAGE_DEADLINE, LAUNCHES.setdefault((location, language), {}), LAUNCH_AFTER, threads)
+
+    elif location == 'CL':
+        return locations.chile(items, location, language, user_agent, proxy, KEYWORDS, start)
+
+    elif location == 'BR':
+        return locations.brazil(items, location, language, user_agent, proxy, KEYWORDS, start)
+
+
+def group_launches(results):
+    """
+    Collapses a launch seen in several regions in the same cycle into a single notification listing the regions
+    """
+    launches = {}
+    for location, to_discord in results:
+        for product in to_discord:
+            key = product['style_code'] or product['url']
+            if key not in launches:
+                launches[key] = dict(product, regions=[location], sizes=[(location, product['sizes'])])
+            else:
+                launches[key]['regions'].append(location)
+                launches[key]['sizes'].append((location, product['sizes']))
+
+    return list(launches.values())
+
+
 def monitor():
     """
     Initiates the monitor
@@ -71,8 +140,23 @@ def monitor():
 ---------------------------------\n''')
     logging.info(msg='Successfully started monitor')
 
-    # Ensures that first scrape does not notify all products
-    start = 1
+    # Regions as (country code, language code), which also key each region's state
+    regions = list(dict.fromkeys(tuple(region.split()) for region in REGIONS)) if REGIONS != [] else [(LOCATION, LANGUAGE)]
+    for location, language in regions:
+        if location not in locations.___standard_api___ and location not in ['CL', 'BR']:
+            print(f'LOCATION "{location}" CURRENTLY NOT AVAILABLE. IF YOU BELIEVE THIS IS A MISTAKE PLEASE CREATE AN ISSUE ON GITHUB OR MESSAGE THE #issues CHANNEL IN DISCORD.')
+            return
+
+    # Regions are named by country code, with the language added for countries monitored in several languages
+    countries = [location for location, language in regions]
+    labels = {region: region[0] if countries.count(region[0]) == 1 else ' '.join(region) for region in regions}
+
+    # Global budget for feed requests across all regions
+    locations.REQUESTS_PER_SECOND = REQUESTS_PER_SECOND
+    locations.BROWSER_RECYCLE = BROWSER_RECYCLE
+
+    # Ensures that first scrape of each region does not notify all products
+    start = {region: 1 for region in regions}
 
     # Initialising proxy and headers
     if ENABLE_FREE_PROXY:
@@ -84,28 +168,69 @@ def monitor():
         proxy = {}
     user_agent = user_agent_rotator.get_random_user_agent()
 
+    # Standard API regions are polled concurrently, other regions in turn
+    executor = ThreadPoolExecutor(max_workers=len(regions))
+
+    # Time of the next full feed scan or poll of each region
+    next_scan = {region: 0 for region in regions}
+
     while True:
         # Makes request to site and stores products 
-        try:
-            if LOCATION in locations.___standard_api___:
-                to_discord = locations.standard_api(INSTOCK, LOCATION, LANGUAGE, user_agent, proxy, KEYWORDS, start)
-
-            elif LOCATION == 'CL':
-                to_discord = locations.chile(INSTOCK, LOCATION, LANGUAGE, user_agent, proxy, KEYWORDS, start)
+        now = time.time()
+        futures = {}
+        polled = []
+        for region in regions:
+            location, language = region
+            if location in locations.___standard_api___:
+                if now >= next_scan[region]:
+                    futures[region] = executor.submit(scrape_region, location, language, user_agent, proxy, start[region])
+                    polled.append(region)
+                else:
+                    # Between full scans only threads that are about to launch are requested
+                    threads = locations.armed_threads(LAUNCHES.get(region, {}), now, LAUNCH_BEFORE, LAUNCH_AFTER)
+                    if threads != []:
+                        futures[region] = executor.submit(scrape_region, location, language, user_agent, proxy, start[region], threads)
+
+            elif now >= next_scan[region]:
+                polled.append(region)
+        
+        results = []
+        rotate = False
+        for region in regions:
+            if region not in futures and region not in polled:
+                continue
+
+            location, language = region
+            try:
+                if region in futures:
+                    to_discord = futures[region].result()
+                else:
+                    to_discord = scrape_region(location, language, user_agent, proxy, start[region])
+                results.append((labels[region], to_discord))
+
+                # Allows changes to be notified
+                start[region] = 0
+                if region in polled:
+                    next_scan[region] = now + (FEED_INTERVAL if location in locations.___standard_api___ else float(DELAY))
+
+            except rq.exceptions.RequestException as e:
+                logging.error(e)
+                rotate = True
+
+            except Exception as e:
+                print(f"Exception found: {traceback.format_exc()}")
+                logging.error(e)
 
-            elif LOCATION == 'BR':
-                to_discord = locations.brazil(INSTOCK, LOCATION, LANGUAGE, user_agent, proxy, KEYWORDS, start)
-            
-            else:
-                print(f'LOCATION "{LOCATION}" CURRENTLY NOT AVAILABLE. IF YOU BELIEVE THIS IS A MISTAKE PLEASE CREATE AN ISSUE ON GITHUB OR MESSAGE THE #issues CHANNEL IN DISCORD.')
-                return
-            
-            for product in to_discord:
-                discord_webhook(product['title'], product['description'], product['url'], product['thumbnail'], product['price'], product['style_code'], product['sizes'])
+        try:
+            for product in group_launches(results):
+                discord_webhook(product['title'], product['description'], product['url'], product['thumbnail'], product['price'], product['style_code'], product['sizes'], product['regions'] if len(regions) > 1 else None)
                 print(product['title'])
 
-        except rq.exceptions.RequestException as e:
+        except Exception as e:
+            print(f"Exception found: {traceback.format_exc()}")
             logging.error(e)
+
+        if rotate:
             logging.info('Rotating headers and proxy')
 
             # Rotates headers
@@ -118,15 +243,10 @@ def monitor():
                 proxy_no = 0 if proxy_no == (len(PROXY)-1) else proxy_no + 1
                 proxy = {"http": PROXY[proxy_no], "https": PROXY[proxy_no]}
 
-        except Exception as e:
-            print(f"Exception found: {traceback.format_exc()}")
-            logging.error(e)
-
-        # Allows changes to be notified
-        start = 0
-
-        # User set delay
-        time.sleep(float(DELAY))
+        # Polls faster while a launch is starting, otherwise uses the user set delay
+        now = time.time()
+        armed = any(locations.armed_threads(LAUNCHES.get(region, {}), now, LAUNCH_BEFORE, LAUNCH_AFTER) != [] for region in regions)
+        time.sleep(float(LAUNCH_DELAY) if armed else float(DELAY))
 
 if __name__ == '__main__':
     urllib3.disable_warnings()
@@ -0,0 +1,94 @@
+"""
+Benchmark for reading the embedded products JSON from the collections page
+Compares a full BeautifulSoup parse against scanning the raw bytes for the script tag
+Usage: python bench_extract.py [saved collections page]
+"""
+import json
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from monitor import extract_products
+
+FIXTURE = 'collections_fixture.html'
+RUNS = 10
+
+
+def build_fixture(path, products=300, variants=6):
+    """
+    Saves a collections page with product markup around the embedded products JSON
+    """
+    output = []
+    cards = []
+    for pid in range(1, products + 1):
+        output.append({
+            'id': pid,
+            'title': f'Box Logo Hooded Sweatshirt {pid}',
+            'url': f'/products/box-logo-hooded-sweatshirt-{pid}',
+            'image': f'//cdn.shopify.com/s/files/1/0001/products/{pid}.jpg',
+            'variants': [{
+                'id': pid * 100 + i, 'name': f'Box Logo Hooded Sweatshirt {pid} - Size {i}', 'title': f'Size {i}',
+                'sku': f'SUP-{pid}-{i}', 'price': 14800, 'available': i % 2 == 0
+            } for i in range(variants)]
+        })
+        cards.append(
+            f'<li class="collection-product" data-product-id="{pid}"><a href="/products/box-logo-hooded-sweatshirt-{pid}">'
+            f'<div class="product-image"><img src="//cdn.shopify.com/s/files/1/0001/products/{pid}.jpg" alt="Box Logo {pid}" loading="lazy"></div>'
+            f'<div class="product-info"><span class="product-title">Box Logo Hooded Sweatshirt {pid}</span>'
+            f'<span class="product-price">&pound;148</span><span class="product-colour">Black</span></div></a></li>')
+
+    page = (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>Supreme</title>'
+        '<style>' + '.collection-product{display:block;margin:0 auto;padding:4px}' * 500 + '</style>'
+        '<script>window.theme = {"strings": {"soldOut": "sold out"}};</script></head><body>'
+        '<header><nav>' + ''.join(f'<a href="/collections/{c}">{c}</a>' for c in ['new', 'jackets', 'shirts', 'tops-sweaters', 'sweatshirts', 'pants', 'hats', 'bags', 'accessories', 'skate']) + '</nav></header>'
+        '<main><ul class="collection-products">' + ''.join(cards) + '</ul></main>'
+        '<script type="application/json" class="js-first-all-products-json">' + json.dumps({'products': output}) + '</script>'
+        '<footer>' + '<p>Supreme</p>' * 50 + '</footer></body></html>')
+
+    with open(path, 'w') as f:
+        f.write(page)
+
+
+def parse_full_page(content):
+    """
+    Previous behaviour: parses the whole page with BeautifulSoup to find the script tag
+    """
+    soup = BeautifulSoup(content.decode('utf-8'), 'html.parser')
+    products = soup.find('script', {'class': 'js-first-all-products-json'})
+    return json.loads(products.text)['products']
+
+
+def measure(name, extract, content):
+    """
+    Prints the best CPU time of an extraction method
+    """
+    products = extract(content)
+    best = None
+    for _ in range(RUNS):
+        t = time.process_time()
+        extract(content)
+        elapsed = time.process_time() - t
+        best = elapsed if best is None else min(best, elapsed)
+
+    print(f'   {name:<12} {best * 1000:9.2f} ms   {len(products)} products')
+    return best
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else FIXTURE
+    if not os.path.exists(path):
+        print(f'[INFO] Saving fixture to {path}')
+        build_fixture(path)
+
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    print('=' * 80)
+    print(f'Extracting products from {path} ({len(content) / 1024:.0f} KiB), best of {RUNS} runs')
+    print('=' * 80)
+    full = measure('BeautifulSoup', parse_full_page, content)
+    scan = measure('byte scan', extract_products, content)
+    print(f'\n   Byte scan is {full / scan:.0f}x faster')
@@ -10,6 +10,21 @@ FREE_PROXY_LOCATION = ["GB"]
 # Delay between site requests
 DELAY = 10
 
+# --------------------- PAGINATION ---------------------
+# Maximum number of products.json pages requested at the same time
+MAX_CONCURRENT_PAGES = 4
+
+# --------------------- DROP BURST ---------------------
+# During the weekly drop window, BURST_WORKERS staggered requests are kept in flight, each started
+# BURST_DELAY / BURST_WORKERS seconds after the last. Outside the window the monitor uses DELAY
+# DROP_DAY is the day of the week (Monday is 0, Thursday is 3) and times are "HH:MM" in DROP_TIMEZONE
+DROP_DAY = 3
+DROP_START = "10:55"
+DROP_END = "11:15"
+DROP_TIMEZONE = "Europe/London"
+BURST_WORKERS = 4
+BURST_DELAY = 2
+
 # --------------------- OPTIONAL PROXY ---------------------
 # Proxies must follow this format: "<proxy>:<port>" OR "<proxy_username>:<proxy_password>@<proxy_domain>:<port>")
 # If you want to use multiple proxies, please create an array
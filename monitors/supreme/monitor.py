@@ -6,14 +6,17 @@ import requests
 import urllib3
 from fp.fp import FreeProxy
 
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from zoneinfo import ZoneInfo
 from datetime import datetime
 import time
+import math
 
 import json
 import logging
 import traceback
 
-from config import WEBHOOK, ENABLE_FREE_PROXY, FREE_PROXY_LOCATION, DELAY, PROXY, KEYWORDS, USERNAME, AVATAR_URL, COLOUR
+from config import WEBHOOK, ENABLE_FREE_PROXY, FREE_PROXY_LOCATION, DELAY, PROXY, KEYWORDS, USERNAME, AVATAR_URL, COLOUR, DROP_DAY, DROP_START, DROP_END, DROP_TIMEZONE, BURST_WORKERS, BURST_DELAY, MAX_CONCURRENT_PAGES
 
 logging.basicConfig(filename='supreme-monitor.log', filemode='a', format='%(asctime)s - %(name)s - %(message)s',
                     level=logging.DEBUG)
@@ -25,10 +28,53 @@ user_agent_rotator = UserAgent(software_names=software_names, hardware_type=hard
 if ENABLE_FREE_PROXY:  
     proxy_obj = FreeProxy(country_id=FREE_PROXY_LOCATION, rand=True)
 
-INSTOCK = []
+INSTOCK = set()  # Ids of variants currently in stock
 
+STORE_URL = 'https://uk.supreme.com'
+COLLECTION_URL = STORE_URL + '/collections/all'
 
-def discord_webhook(title, price, variant, sku, thumbnail, url):
+# Products per products.json page (Shopify maximum)
+PAGE_LIMIT = 250
+
+# Number of products seen on the previous poll, used to predict the page count
+CATALOG_SIZE = 0
+
+# Class of the script tag holding the collection's products JSON
+PRODUCTS_MARKER = b'js-first-all-products-json'
+
+# Index of the proxy in use from PROXY
+PROXY_NO = 0
+
+# Pooled session shared by every request, including concurrent pages and burst workers
+SESSION = requests.Session()
+SESSION.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=BURST_WORKERS * MAX_CONCURRENT_PAGES))
+
+
+def size_fields(sizes, limit=1024, total=5000):
+    """
+    Splits the size lines across as many fields as Discord's 1024 character field limit needs.
+    Lines past the overall embed limit are counted instead of listed
+    """
+    lines = [size['title'] if not size.get('sku') else f"{size['title']} ({size['sku']})" for size in sizes]
+    shown = []
+    used = 0
+    for line in lines:
+        if used + len(line) + 1 > total:
+            shown.append(f'... and {len(lines) - len(shown)} more')
+            break
+        shown.append(line)
+        used += len(line) + 1
+
+    fields = ['']
+    for line in shown:
+        if fields[-1] and len(fields[-1]) + len(line) + 1 > limit:
+            fields.append('')
+        fields[-1] = line if not fields[-1] else fields[-1] + '\n' + line
+
+    return [{"name": "Sizes" if i == 0 else "Sizes (cont.)", "value": value} for i, value in enumerate(fields)]
+
+
+def discord_webhook(title, price, sizes, thumbnail, url):
     """
     Sends a Discord webhook notification to the specified webhook URL
     """
@@ -42,11 +88,7 @@ def discord_webhook(title, price, variant, sku, thumbnail, url):
             "color": int(COLOUR),
             "footer": {'text': 'Developed by GitHub:yasserqureshi1'},
             "timestamp": str(datetime.utcnow()),
-            "fields": [
-                {"name": "SKU", "value": sku},
-                {"name": "Variant", "value": variant},
-                {"name": "Price", "value": price}
-            ]
+            "fields": [{"name": "Price", "value": price}] + size_fields(sizes)
         }]
     }
 
@@ -62,43 +104,246 @@ def discord_webhook(title, price, variant, sku, thumbnail, url):
         logging.info(msg="Payload delivered successfully, code {}.".format(result.status_code))
 
 
+def find_products_json(content):
+    """
+    Finds the embedded products JSON by scanning the raw page bytes for its script tag.
+    Returns None when the tag cannot be found
+    """
+    marker = content.find(PRODUCTS_MARKER)
+    while marker != -1:
+        # The marker must sit inside an opening script tag, not in a stylesheet or another script
+        tag = content.rfind(b'<', 0, marker)
+        if content.startswith(b'<script', tag) and content.find(b'>', tag, marker) == -1:
+            start = content.find(b'>', marker) + 1
+            end = content.find(b'</script>', start)
+            if start and end != -1:
+                return content[start:end]
+        marker = content.find(PRODUCTS_MARKER, marker + 1)
+    return None
+
+
+def extract_products(content):
+    """
+    Decodes the products embedded in the collections page, only parsing the full page when the script tag cannot be found by scanning
+    """
+    products = find_products_json(content)
+    if products is not None:
+        try:
+            return json.loads(products)['products']
+        except ValueError:
+            logging.info(msg='Embedded products JSON could not be decoded, parsing full page')
+
+    soup = BeautifulSoup(content, 'html.parser')
+    products = soup.find('script',{'class':'js-first-all-products-json'})
+    return json.loads(products.text)['products']
+
+
 def scrape_main_site(headers, proxy):
-    url = 'https://uk.supreme.com/collections/all'
+    """
+    Scrapes the products embedded in the collections page. Only used when the JSON feed is unavailable
+    """
+    html = SESSION.get(COLLECTION_URL, headers=headers, proxies=proxy, timeout=10)
+
+    # Converts to the same format as the JSON feed
+    stock = []
+    for item in extract_products(html.content):
+        stock.append({
+            'id': item['id'],
+            'title': item['title'],
+            'url': item['url'],
+            'image': 'https:' + item['image'],
+            'variants': [{
+                'id': variant['id'],
+                'title': variant['title'],
+                'sku': variant['sku'],
+                'price': str(variant['price']/100),
+                'available': variant['available']} for variant in item['variants']]
+        })
+    return stock
+
+
+def product_hook(obj):
+    """
+    Reduces every decoded JSON object to the fields used by the monitor as soon as it is built
+    """
+    if 'handle' in obj:
+        # Product - keeps the first image only
+        images = obj.get('images')
+        return {
+            'id': obj['id'],
+            'title': obj['title'],
+            'url': '/products/' + obj['handle'],
+            'image': images[0] if images else None,
+            'variants': obj['variants']}
 
-    html = requests.get(url, headers=headers, proxies=proxy)
-    soup = BeautifulSoup(html.text, 'html.parser')
+    if 'available' in obj:
+        # Variant
+        return {'id': obj['id'], 'title': obj['title'], 'sku': obj.get('sku'), 'price': obj['price'], 'available': obj['available']}
+
+    if 'src' in obj:
+        # Image
+        return obj['src']
+
+    return obj
 
-    products = soup.find('script',{'class':'js-first-all-products-json'})
-    output = json.loads(products.text)['products']
 
-    return output
+def get_products(page, headers, proxy):
+    """
+    Requests a single products.json page of the collection and returns its products
+    """
+    html = SESSION.get(COLLECTION_URL + f'/products.json?page={page}&limit={PAGE_LIMIT}', headers=headers, proxies=proxy, timeout=10)
+    return json.loads(html.content, object_hook=product_hook)['products']
+
+
+def scrape_site(headers, proxy):
+    """
+    Scrapes the collection's products.json feed, requesting pages concurrently until a page that is not full is returned.
+    Falls back to the collections page when the feed is unavailable
+    """
+    global CATALOG_SIZE
+
+    # Enough pages to hold the previous catalog plus one product, so a stable catalog completes in one round
+    batch_size = max(1, math.ceil((CATALOG_SIZE + 1) / PAGE_LIMIT))
+    stock = []
+    page = 1
+
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_PAGES) as executor:
+            while True:
+                for output in executor.map(lambda n: get_products(n, headers, proxy), range(page, page + batch_size)):
+                    stock.extend(output)
+                    if len(output) < PAGE_LIMIT:
+                        # A page that is not full is the last page of the collection
+                        CATALOG_SIZE = len(stock)
+                        return stock
+
+                # Collection grew beyond the prediction - keeps going a full batch at a time
+                page += batch_size
+                batch_size = MAX_CONCURRENT_PAGES
+
+    except (ValueError, KeyError) as e:
+        logging.error(msg='JSON feed unavailable, scraping collections page: ' + str(e))
+        return scrape_main_site(headers, proxy)
 
 
 def comparitor(item, start):
+    """
+    Updates the stored variants of a product and sends a single notification for all of its variants that came back in stock
+    """
+    restocked = []
     for variant in item["variants"]:
-        variant_id = variant['id']
         if variant["available"] == True:
             # Checks if it already exists in our instock
-            if variant_id not in INSTOCK:
-                # Add to instock array
-                INSTOCK.append(variant_id)
-
-                # Send a notification to the discord webhook with the in-stock product
-                if start == 0:
-                    print(variant["name"])
-                    discord_webhook(
-                        title=variant["name"],
-                        price=str(variant['price']/100),
-                        variant=variant['title'],
-                        sku=variant["sku"],
-                        thumbnail='https:' + item["image"],
-                        url='https://uk.supremenewyork.com' + item['url']
-                    )
-                    logging.info(msg='Successfully sent Discord notification')
+            if variant['id'] not in INSTOCK:
+                INSTOCK.add(variant['id'])
+                restocked.append(variant)
 
         else:
-            if variant_id in INSTOCK:
-                INSTOCK.remove(variant_id)
+            INSTOCK.discard(variant['id'])
+
+    # Send a notification to the discord webhook with the in-stock sizes of the product
+    if restocked and start == 0:
+        print(item["title"], [variant['title'] for variant in restocked])
+        discord_webhook(
+            title=item["title"],
+            price=restocked[0]['price'],
+            sizes=restocked,
+            thumbnail=item["image"],
+            url=STORE_URL + item['url']
+        )
+        logging.info(msg='Successfully sent Discord notification')
+
+
+def process_stock(stock, start):
+    """
+    Checks every product that matches the keywords for changes
+    """
+    for item in stock:
+        if KEYWORDS == []:
+            # If no keywords set, checks whether item status has changed
+            comparitor(item, start)
+        
+        else:
+            # For each keyword, checks whether particular item status has changed
+            for key in KEYWORDS:
+                if key.lower() in item['title'].lower():
+                    comparitor(item, start)
+
+
+def in_drop_window():
+    """
+    Determines whether the current time falls within the weekly drop window
+    """
+    now = datetime.now(ZoneInfo(DROP_TIMEZONE))
+    return now.weekday() == DROP_DAY and DROP_START <= now.strftime('%H:%M') < DROP_END
+
+
+def rotate(headers, proxy):
+    """
+    Rotates the user agent and proxy in place after a failed request
+    """
+    global PROXY_NO
+
+    logging.info('Rotating headers and proxy')
+    headers['user-agent'] = user_agent_rotator.get_random_user_agent()
+
+    if ENABLE_FREE_PROXY:
+        proxy['http'] = proxy_obj.get()
+
+    elif PROXY != []:
+        PROXY_NO = 0 if PROXY_NO == (len(PROXY)-1) else PROXY_NO + 1
+        proxy.update({"http": PROXY[PROXY_NO], "https": PROXY[PROXY_NO]})
+
+
+def burst(headers, proxy, start):
+    """
+    Polls with up to BURST_WORKERS staggered requests in flight until the drop window closes,
+    starting a new request every BURST_DELAY / BURST_WORKERS seconds.
+    A failed request is logged and replaced without stopping the others.
+    Returns the updated start flag
+    """
+    interval = float(BURST_DELAY) / BURST_WORKERS
+    pending = {}  # {future: request number}
+    latest = 0  # Request number of the newest response processed
+    sent = 0
+    next_request = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=BURST_WORKERS) as executor:
+        while in_drop_window():
+            if len(pending) < BURST_WORKERS and time.monotonic() >= next_request:
+                sent += 1
+                pending[executor.submit(scrape_site, dict(headers), dict(proxy))] = sent
+                next_request = time.monotonic() + interval
+
+            # Waits for a response, or until the next request is due if there is room for one
+            timeout = max(0, next_request - time.monotonic()) if len(pending) < BURST_WORKERS else None
+            if not pending:
+                time.sleep(timeout)
+                continue
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=pending.get):
+                request = pending.pop(future)
+                try:
+                    stock = future.result()
+
+                except requests.exceptions.RequestException as e:
+                    logging.error(e)
+                    rotate(headers, proxy)
+                    continue
+
+                except Exception as e:
+                    print(f"Exception found: {traceback.format_exc()}")
+                    logging.error(e)
+                    continue
+
+                # Responses can arrive out of order - an older response must not undo a newer one
+                if request > latest:
+                    latest = request
+                    process_stock(stock, start)
+                    start = 0
+
+    return start
 
 
 def monitor():
@@ -117,8 +362,7 @@ def monitor():
     if ENABLE_FREE_PROXY:
         proxy = {'http': proxy_obj.get()}
     elif PROXY != []:
-        proxy_no = 0
-        proxy = {} if PROXY == [] else {"http": PROXY[proxy_no], "https": PROXY[proxy_no]}
+        proxy = {"http": PROXY[PROXY_NO], "https": PROXY[PROXY_NO]}
     else:
         proxy = {}
 
@@ -131,41 +375,27 @@ def monitor():
 
     while True:
         try:
-            # Makes request to site and stores products 
-            stock = scrape_main_site(proxy, headers)
-            for item in stock:
-                if KEYWORDS == []:
-                    # If no keywords set, checks whether item status has changed
-                    comparitor(item, start)
-                
-                else:
-                    # For each keyword, checks whether particular item status has changed
-                    for key in KEYWORDS:
-                        if key.lower() in item['title'].lower():
-                            comparitor(item, start)
+            if in_drop_window():
+                # Polls at sub-second intervals until the drop window closes
+                start = burst(headers, proxy, start)
+            
+            else:
+                # Makes request to site and stores products 
+                stock = scrape_site(headers, proxy)
+                process_stock(stock, start)
             
             # Allows changes to be notified
             start = 0
 
         except requests.exceptions.RequestException as e:
             logging.error(e)
-            logging.info('Rotating headers and proxy')
-
-            # Rotates headers
-            headers["User-Agent"] = user_agent_rotator.get_random_user_agent()
-
-            if ENABLE_FREE_PROXY:
-                proxy = {'http': proxy_obj.get()}
-
-            elif PROXY != []:
-                proxy_no = 0 if proxy_no == (len(PROXY)-1) else proxy_no + 1
-                proxy = {"http": PROXY[proxy_no], "https": PROXY[proxy_no]}
+            rotate(headers, proxy)
 
         except Exception as e:
             print(f"Exception found: {traceback.format_exc()}")
             logging.error(e)
 
-        time.sleep(float(DELAY))
+        time.sleep(float(BURST_DELAY) if in_drop_window() else float(DELAY))
 
 if __name__ == '__main__':
     urllib3.disable_warnings()